@@ -0,0 +1,567 @@
+"""Sahte modelle (fake_model.py) hat ölçümleri; API anahtarı gerekmez.
+
+- workers: sayfa başına istek modunda 1, 4 ve 8 işçiyle (işçi sayısı
+  anahtar sayısına eşittir) gecikme ve 429 enjekte edilerek sayfa/dakika.
+- batch: aynı sayfalar için sayfa başına ve toplu modun çağrı sayıları ve
+  süreleri.
+- font_fit: rastgele balonlarda saniyede kaç balonun yazı boyutunun
+  bulunduğu; 100'den 8'e tek tek deneyen eski yöntemle karşılaştırmalı.
+- render: seyrek ve yoğun sayfalarda sayfa başına çizim süresi ve tepe
+  bellek; her balon için sayfa boyutunda katman oluşturan eski yöntemle
+  karşılaştırmalı.
+- corpus: cli.py'nin toplu çevirisiyle sentetik CBZ'lerden oluşan bir
+  derlemin 1, 2 ve 4 süreçle sayfa/dakika hızı.
+- viewer: 200 sayfalık bir bölümde okuyucunun her yeniden çalıştırmada
+  gönderdiği bayt ve bu HTML'in sunucuda hazırlanma süresi (etkileşime
+  hazır olma süresinin sunucu tarafı); tüm sayfaları tam çözünürlükte
+  gönderen eski okuyucuyla karşılaştırmalı.
+- export: çevrilen sayfaların PDF'e aktarılma süresi ve tepe bellek;
+  sayfalar bittikçe ekleyen IncrementalExporter ile tüm sayfaları sonda
+  Pillow'la tek seferde yazan eski yöntem karşılaştırılır.
+- first_page: 500 sayfalık bir CBZ'de ilk çevrilen sayfaya kadar geçen süre
+  ve tepe bellek; eski yöntem (önce tüm sayfaları PNG'ye dökmek) ile
+  sayfaları istendikçe okumak karşılaştırılır.
+
+Tepe bellek ölçülen senaryolar temiz bir alt süreçte çalışır; verilen
+değer, işten önceki anlık bellek ile işten sonraki tepe bellek (ru_maxrss)
+arasındaki farktır.
+
+    python bench_pipeline.py --pages 40 --latency 0.5 --rate-limit-ratio 0.05
+    python bench_pipeline.py --only first_page --cbz-pages 500
+"""
+import argparse
+import base64
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import textwrap
+import time
+import zipfile
+from functools import partial
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import cli
+from exporter import IncrementalExporter
+from fake_model import FakeModel, FakeModelFactory
+from page_cache import TranslationCache
+from page_source import iter_pages, open_page_source
+from pipeline import KeyPool
+from preview import PREVIEW_MIME, save_preview
+from renderer import render_translations
+from text_layout import LINE_SPACING, get_optimal_font_size
+from translator import FONT_PATH, Translator
+
+try:
+    import resource
+except ImportError:  # Windows: tepe bellek ölçülmez
+    resource = None
+
+WORKER_COUNTS = (1, 4, 8)
+CORPUS_JOBS = (1, 2, 4)
+CORPUS_KEYS = 4
+PAGE_SIZE = (800, 1200)
+MANGA_PAGE_SIZE = (1100, 1600)
+RENDER_BUBBLES = {'seyrek': 2, 'yoğun': 30}
+RENDER_REPEATS = 5
+FIT_WORDS = "NE OLUYOR BURADA BEKLE BENİ ASLA VAZGEÇMEYECEĞİM HAYIR DUR ARTIK YETER".split()
+
+
+# --- Ortak yardımcılar ---
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _current_rss_mb():
+    """Şu anki bellek (Linux); yoksa tepe bellek. İçe aktarmaların geçici tepesi ölçüme karışmasın diye kullanılır."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return _peak_rss_mb()
+
+
+def _isolated_child(conn, func, args):
+    try:
+        before = _current_rss_mb()
+        result = func(*args)
+        after = _peak_rss_mb()
+        conn.send((result, None if before is None else after - before, None))
+    except Exception as e:
+        conn.send((None, None, repr(e)))
+    conn.close()
+
+
+def isolated(func, *args):
+    """`func(*args)`'ı yeni bir süreçte çalıştırır; (sonuç, ek tepe bellek MB) döndürür.
+
+    ru_maxrss süreç boyunca yalnızca artar; her ölçüm temiz süreçte yapılır
+    ki önceki ölçümlerin belleği karışmasın. Ek bellek, işten önceki anlık
+    bellek ile işten sonraki tepe bellek arasındaki farktır.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_isolated_child, args=(sender, func, args))
+    process.start()
+    result, peak, error = receiver.recv()
+    process.join()
+    if error is not None:
+        raise RuntimeError(f"Ölçüm alt süreçte başarısız: {error}")
+    return result, peak
+
+
+def _format_mb(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+def make_pages(count, seed=0):
+    """Birbirine benzemeyen (önbellekte eşleşmeyen) gürültü sayfalarını JPEG bayt olarak üretir."""
+    rng = np.random.default_rng(seed)
+    pages = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, (PAGE_SIZE[1] // 8, PAGE_SIZE[0] // 8), dtype=np.uint8)
+        img = Image.fromarray(pixels, "L").resize(PAGE_SIZE, Image.NEAREST).convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=85)
+        pages.append(buffer.getvalue())
+    return pages
+
+
+def make_manga_page(rng, size=MANGA_PAGE_SIZE):
+    """Panel çerçeveleri, çizgiler, koyu alanlar ve boş balonlardan oluşan sentetik sayfa.
+
+    Gürültü sayfalarının aksine gerçek sayfalar gibi sıkıştırılabilir;
+    dosya boyutu ve kodlama süresi ölçümleri için kullanılır.
+    """
+    width, height = size
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for row in range(3):
+        top = row * height // 3 + 10
+        draw.rectangle([10, top, width - 10, top + height // 3 - 20], outline="black", width=4)
+    for _ in range(150):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.line([x, y, x + rng.randint(-120, 120), y + rng.randint(-120, 120)], fill=(rng.randint(0, 90),) * 3, width=rng.randint(1, 4))
+    for _ in range(4):
+        x, y = rng.randrange(width - 300), rng.randrange(height - 200)
+        draw.rectangle([x, y, x + rng.randint(100, 300), y + rng.randint(60, 200)], fill=(rng.randint(30, 120),) * 3)
+    for _ in range(3):
+        x, y = rng.randrange(width - 260), rng.randrange(height - 160)
+        draw.ellipse([x, y, x + 260, y + 160], fill="white", outline="black", width=3)
+    return img
+
+
+def write_cbz(path, count, seed=0):
+    """`count` sentetik sayfalık (JPEG) bir CBZ yazar."""
+    rng = random.Random(seed)
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for idx in range(count):
+            buffer = io.BytesIO()
+            make_manga_page(rng).save(buffer, format="JPEG", quality=85)
+            archive.writestr(f"{idx:04d}.jpg", buffer.getvalue())
+    return path
+
+
+def fake_translator(run_dir, workers=1, latency=0.0, rate_limit_ratio=0.0, requests_per_minute=60000):
+    """Boş önbellekli, sahte modelle çalışan bir Translator ve model üreticisi döndürür."""
+    factory = FakeModelFactory(latency=latency, rate_limit_ratio=rate_limit_ratio)
+    key_pool = KeyPool([f"sahte-{i}" for i in range(workers)], factory, requests_per_minute=requests_per_minute)
+    translator = Translator(key_pool, TranslationCache(os.path.join(run_dir, "cache.sqlite")), make_previews=False)
+    return translator, factory
+
+
+# --- Sayfa/dakika ve toplu istek ---
+def run_pipeline(pages, workers, batch_mode, options, work_dir):
+    """Sayfaları boş bir önbellekle hattan geçirir; (süre, biten sayfa, çağrı, 429) döndürür."""
+    run_dir = tempfile.mkdtemp(dir=work_dir)
+    translator, factory = fake_translator(run_dir, workers, options.latency, options.rate_limit_ratio, options.requests_per_minute)
+    pipeline = translator.build_pipeline(batch_mode, prefilter=False)
+
+    def page_items():
+        for idx, data in enumerate(pages):
+            yield idx, {'idx': idx, 'status': 'pending', 'log': '', 'data': data,
+                        'out_path': os.path.join(run_dir, f"{idx:05d}_tr.jpg")}
+
+    started = time.perf_counter()
+    done = sum(1 for event in pipeline.run(page_items()) if event[0] == 'page' and event[2]['status'] == 'done')
+    return time.perf_counter() - started, done, factory.calls, factory.rejected
+
+
+def bench_workers(options, work_dir):
+    pages = make_pages(options.pages)
+    print(f"Sayfa/dakika (sayfa başına istek, {len(pages)} sayfa, gecikme {options.latency}s, 429 oranı {options.rate_limit_ratio})")
+    print(f"{'işçi':>6}{'süre (s)':>10}{'sayfa/dk':>10}{'çağrı':>8}{'429':>6}{'biten':>7}")
+    for workers in WORKER_COUNTS:
+        elapsed, done, calls, rejected = run_pipeline(pages, workers, False, options, work_dir)
+        print(f"{workers:>6}{elapsed:>10.1f}{done / elapsed * 60:>10.1f}{calls:>8}{rejected:>6}{done:>7}")
+
+
+def bench_batch(options, work_dir):
+    pages = make_pages(options.pages)
+    workers = WORKER_COUNTS[0]
+    print(f"Toplu istek ({len(pages)} sayfa, {workers} anahtar)")
+    print(f"{'mod':>12}{'süre (s)':>10}{'çağrı':>8}{'çağrı/sayfa':>13}")
+    for label, batch_mode in (("sayfa başına", False), ("toplu", True)):
+        elapsed, done, calls, _ = run_pipeline(pages, workers, batch_mode, options, work_dir)
+        print(f"{label:>12}{elapsed:>10.1f}{calls:>8}{calls / max(1, done):>13.2f}")
+
+
+# --- Font sığdırma ---
+def get_optimal_font_size_linear(text, box_width, box_height, font_path="manga_font.ttf", max_font_size=100, min_font_size=8, padding=0):
+    """Eski font sığdırma: her boyutta font diskten yüklenip büyükten küçüğe denenir (karşılaştırma için kopya)."""
+    draw = ImageDraw.Draw(Image.new("L", (1, 1)))
+    for font_size in range(max_font_size, min_font_size - 1, -1):
+        font = ImageFont.truetype(font_path, font_size)
+        # Satır uzunluğunu fonta ve kutuya göre tahmini ayarla
+        max_chars_per_line = max(1, int(box_width // (font_size * 0.6)))
+        wrapped = textwrap.fill(text, width=max_chars_per_line)
+        bbox = draw.multiline_textbbox((0, 0), wrapped, font=font, spacing=4)
+        if bbox[2] - bbox[0] <= box_width - 2 * padding and bbox[3] - bbox[1] <= box_height - 2 * padding:
+            return font, font_size, wrapped
+    max_chars_per_line = max(1, int(box_width // (min_font_size * 0.6)))
+    return ImageFont.truetype(font_path, min_font_size), min_font_size, textwrap.fill(text, width=max_chars_per_line)
+
+
+def bench_font_fit(options, work_dir):
+    rng = random.Random(0)
+    bubbles = [
+        (" ".join(rng.choice(FIT_WORDS) for _ in range(rng.randint(2, 14))), rng.randint(80, 400), rng.randint(60, 300))
+        for _ in range(options.bubbles)
+    ]
+    print(f"Font sığdırma ({len(bubbles)} balon)")
+    print(f"{'yöntem':>26}{'süre (s)':>10}{'balon/s':>10}")
+    # Önceki çağrıların sonuçları ölçümü şişirmesin
+    get_optimal_font_size.cache_clear()
+    for label, fit in (("doğrusal tarama (eski)", get_optimal_font_size_linear), ("ikili arama", get_optimal_font_size)):
+        started = time.perf_counter()
+        for text, width, height in bubbles:
+            fit(text, width, height, FONT_PATH)
+        elapsed = time.perf_counter() - started
+        print(f"{label:>26}{elapsed:>10.2f}{len(bubbles) / elapsed:>10.0f}")
+
+
+# --- Çizim ---
+def render_translations_full_overlay(img, detected_items, translated_blocks, font_path):
+    """Eski çizim: her balon için sayfa boyutunda katman oluşturulup tüm sayfa birleştirilir (karşılaştırma için kopya)."""
+    processed_img = img.convert("RGBA")
+    for i, item in enumerate(detected_items):
+        cleaned_translation = translated_blocks[i] if i < len(translated_blocks) and translated_blocks[i] is not None else "Çeviri hatası"
+        ymin, xmin, ymax, xmax = item.get('box')
+        left = xmin * img.width / 1000
+        top = ymin * img.height / 1000
+        right = xmax * img.width / 1000
+        bottom = ymax * img.height / 1000
+        overlay = Image.new("RGBA", processed_img.size, (255, 255, 255, 0))
+        overlay_draw = ImageDraw.Draw(overlay)
+        overlay_draw.rectangle([left, top, right, bottom], fill=(255, 255, 255, 180))
+        processed_img = Image.alpha_composite(processed_img, overlay)
+        draw = ImageDraw.Draw(processed_img)
+        text_box_width = right - left
+        text_box_height = bottom - top
+        font, font_size, wrapped = get_optimal_font_size(cleaned_translation, text_box_width, text_box_height, font_path)
+        bbox = draw.multiline_textbbox((0, 0), wrapped, font=font, spacing=LINE_SPACING)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        text_x = left + (text_box_width - text_width) / 2
+        text_y = top + (text_box_height - text_height) / 2
+        draw.multiline_text((text_x, text_y), wrapped, fill=(0, 0, 0, 255), font=font, spacing=LINE_SPACING, align="center")
+    return processed_img.convert("RGB")
+
+
+def make_bubbles(rng, count):
+    """Rastgele (üst üste binebilen, kesirli koordinatlı) balonlar ve çevirileri üretir."""
+    items, translations = [], []
+    for _ in range(count):
+        ymin, xmin = rng.uniform(0, 900), rng.uniform(0, 900)
+        box = [ymin, xmin, min(1000, ymin + rng.uniform(20, 200)), min(1000, xmin + rng.uniform(20, 200))]
+        items.append({'text': "", 'box': box})
+        translations.append(" ".join(rng.choice(FIT_WORDS) for _ in range(rng.randint(1, 10))))
+    return items, translations
+
+
+def _render_page_timing(render, bubble_count, repeats):
+    rng = random.Random(bubble_count)
+    img = make_manga_page(rng)
+    items, translations = make_bubbles(rng, bubble_count)
+    # İlk çağrı font önbelleğini doldurur; süre yalnızca çizimi ölçsün
+    render(img, items, translations, FONT_PATH)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        render(img, items, translations, FONT_PATH)
+    return (time.perf_counter() - started) / repeats
+
+
+def bench_render(options, work_dir):
+    print(f"Çizim ({MANGA_PAGE_SIZE[0]}x{MANGA_PAGE_SIZE[1]} sayfa, {RENDER_REPEATS} tekrar ortalaması)")
+    print(f"{'sayfa':>18}{'yöntem':>18}{'ms/sayfa':>10}{'tepe bellek (MB)':>18}")
+    for label, bubble_count in RENDER_BUBBLES.items():
+        for method, render in (("tam sayfa (eski)", render_translations_full_overlay), ("kutu bölgesi", render_translations)):
+            elapsed, peak = isolated(_render_page_timing, render, bubble_count, RENDER_REPEATS)
+            print(f"{f'{label} ({bubble_count} balon)':>18}{method:>18}{elapsed * 1000:>10.1f}{_format_mb(peak):>18}")
+
+
+# --- Derlem ---
+def bench_corpus(options, work_dir):
+    corpus_dir = os.path.join(work_dir, "derlem")
+    os.makedirs(corpus_dir)
+    for number in range(options.corpus_files):
+        write_cbz(os.path.join(corpus_dir, f"derlem_cilt_{number + 1:02d}.cbz"), options.corpus_pages, seed=number)
+    inputs = cli.collect_inputs([corpus_dir])
+    total = options.corpus_files * options.corpus_pages
+    print(f"Derlem ({options.corpus_files} dosya x {options.corpus_pages} sayfa, {CORPUS_KEYS} anahtar, gecikme {options.latency}s, toplu istek)")
+    print(f"{'süreç':>6}{'süre (s)':>10}{'sayfa/dk':>10}{'biten':>7}")
+    for jobs in CORPUS_JOBS:
+        run_dir = tempfile.mkdtemp(dir=work_dir)
+        todo = [(path, cli.output_path_for(path, run_dir, "pdf")) for path in inputs]
+        # cli.main ile aynı ayarlar; model, süreçlere gönderilebilsin diye partial ile verilir
+        cli_options = {
+            'api_keys': [f"sahte-{i}" for i in range(CORPUS_KEYS)],
+            'model_factory': partial(FakeModel, latency=options.latency, rate_limit_ratio=options.rate_limit_ratio),
+            'requests_per_minute': options.requests_per_minute / jobs,
+            'batch_mode': True,
+            'prefilter': False,
+            'format': 'pdf',
+            'cache_path': os.path.join(run_dir, "cache.sqlite"),
+            'memory_path': os.path.join(run_dir, "memory.sqlite"),
+            'series': None,
+            'render_workers': max(1, (os.cpu_count() or 1) // jobs),
+            'metrics': False,
+            'verbose': False,
+        }
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            done, _ = cli.translate_files(todo, cli_options, jobs)
+        elapsed = time.perf_counter() - started
+        print(f"{jobs:>6}{elapsed:>10.1f}{done / elapsed * 60:>10.1f}{f'{done}/{total}':>7}")
+
+
+# --- Okuyucu ---
+VIEWER_UNIQUE_PAGES = 20
+VIEWER_WINDOW = 10
+IMG_STYLE = "display:block;margin:0;padding:0;border:none;width:100%;"
+
+
+def _old_viewer_payload(pages):
+    """Eski okuyucu: biten sayfalar tam JPEG, bekleyenler her seferinde PNG'ye kodlanarak, hepsi gönderilir (karşılaştırma için kopya)."""
+    parts = []
+    for idx, page in enumerate(pages):
+        if page['status'] == 'done':
+            with open(page['translated_img_path'], 'rb') as f:
+                img_str = base64.b64encode(f.read()).decode()
+            parts.append(f"<img src='data:image/jpeg;base64,{img_str}' style='{IMG_STYLE}'>")
+        else:
+            img = Image.open(page['img_path'])
+            buffered = io.BytesIO()
+            img.save(buffered, format="PNG")
+            img_str = base64.b64encode(buffered.getvalue()).decode()
+            parts.append(f"### Sayfa {idx+1}")
+            parts.append(f"<img src='data:image/png;base64,{img_str}' style='{IMG_STYLE}'>")
+    return sum(len(part.encode()) for part in parts)
+
+
+def _new_viewer_payload(pages):
+    """app.py'deki okuyucu: yalnızca seçili penceredeki sayfalar; bitenler önizlemeleriyle, bekleyenler yazıyla."""
+    parts = []
+    for idx, page in enumerate(pages[:VIEWER_WINDOW]):
+        if page['status'] == 'done':
+            with open(page['preview_path'], 'rb') as f:
+                img_str = base64.b64encode(f.read()).decode()
+            parts.append(f"<img src='data:{PREVIEW_MIME};base64,{img_str}' style='{IMG_STYLE}'>")
+        else:
+            parts.append(f"### Sayfa {idx+1}")
+            parts.append("Henüz çevrilmedi, lütfen bekleyin...")
+    return sum(len(part.encode()) for part in parts)
+
+
+def bench_viewer(options, work_dir):
+    # Sayfa üretimi uzun sürmesin diye birkaç farklı sayfa dönüşümlü kullanılır; boyutlar gerçek sayfalarınkine yakındır
+    rng = random.Random(0)
+    files = []
+    for number in range(VIEWER_UNIQUE_PAGES):
+        img = make_manga_page(rng)
+        original_path = os.path.join(work_dir, f"sayfa_{number}.png")
+        img.save(original_path, format="PNG")
+        translated_path = os.path.join(work_dir, f"sayfa_{number}_tr.jpg")
+        img.save(translated_path, format="JPEG", quality=95)
+        files.append((original_path, translated_path, save_preview(img, translated_path)))
+    print(f"Okuyucu ({options.viewer_pages} sayfalık bölüm, {MANGA_PAGE_SIZE[0]}x{MANGA_PAGE_SIZE[1]}, pencere {VIEWER_WINDOW} sayfa)")
+    print(f"{'çeviri durumu':>14}{'yöntem':>22}{'MB/yeniden çalıştırma':>23}{'hazırlama (ms)':>16}")
+    for label, done_ratio in (("yarısı bitmiş", 0.5), ("tamamı bitmiş", 1.0)):
+        done_count = int(options.viewer_pages * done_ratio)
+        pages = []
+        for idx in range(options.viewer_pages):
+            original_path, translated_path, preview_path = files[idx % len(files)]
+            pages.append({'status': 'done' if idx < done_count else 'pending', 'img_path': original_path,
+                          'translated_img_path': translated_path, 'preview_path': preview_path})
+        for method, payload in (("tüm sayfalar (eski)", _old_viewer_payload), ("pencere + önizleme", _new_viewer_payload)):
+            started = time.perf_counter()
+            size = payload(pages)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>14}{method:>22}{size / 2**20:>23.1f}{elapsed * 1000:>16.1f}")
+
+
+# --- Dışa aktarma ---
+def create_pdf_of_translated_pages(image_paths):
+    """Eski dışa aktarma: tüm görseller açılıp Pillow ile tek PDF'e yazılır (karşılaştırma için kopya)."""
+    pdf_pages = []
+    for path in image_paths:
+        img = Image.open(path)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        pdf_pages.append(img)
+    if not pdf_pages:
+        return None
+    pdf_buffer = io.BytesIO()
+    pdf_pages[0].save(pdf_buffer, format="PDF", save_all=True, append_images=pdf_pages[1:])
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+def _export_all_at_once(image_paths, out_dir):
+    started = time.perf_counter()
+    size = len(create_pdf_of_translated_pages(image_paths).getvalue())
+    return time.perf_counter() - started, size
+
+
+def _export_incremental(image_paths, out_dir):
+    pdf_path = os.path.join(out_dir, "cikti.pdf")
+    # Sayfalar hattan biraz karışık sırayla gelir
+    rng = random.Random(0)
+    order = sorted(range(len(image_paths)), key=lambda idx: idx + rng.uniform(0, 4))
+    started = time.perf_counter()
+    exporter = IncrementalExporter(pdf_path)
+    try:
+        for idx in order:
+            exporter.add(idx, image_paths[idx])
+    finally:
+        exporter.close()
+    # İndirme anında yalnızca diskteki dosya okunur
+    with open(pdf_path, "rb") as f:
+        size = len(f.read())
+    return time.perf_counter() - started, size
+
+
+def bench_export(options, work_dir):
+    # Sayfa üretimi uzun sürmesin diye birkaç farklı sayfa dönüşümlü kullanılır
+    rng = random.Random(0)
+    unique_paths = []
+    for number in range(VIEWER_UNIQUE_PAGES):
+        path = os.path.join(work_dir, f"disa_aktarma_{number}_tr.jpg")
+        make_manga_page(rng).save(path, format="JPEG", quality=95)
+        unique_paths.append(path)
+    image_paths = [unique_paths[idx % len(unique_paths)] for idx in range(options.export_pages)]
+    # Eski yöntem JPEG'leri Pillow'un varsayılan kalitesiyle yeniden kodlar; artımlı
+    # ekleme dosyaları olduğu gibi gömdüğü için PDF daha büyük ama ek kayıpsızdır
+    print(f"PDF dışa aktarma ({options.export_pages} sayfa, {MANGA_PAGE_SIZE[0]}x{MANGA_PAGE_SIZE[1]} JPEG)")
+    print(f"{'yöntem':>30}{'süre (s)':>10}{'PDF (MB)':>10}{'tepe bellek (MB)':>18}")
+    for label, func in (("sonda tek seferde (eski)", _export_all_at_once), ("bittikçe artımlı ekleme", _export_incremental)):
+        (elapsed, size), peak = isolated(func, image_paths, tempfile.mkdtemp(dir=work_dir))
+        print(f"{label:>30}{elapsed:>10.1f}{size / 2**20:>10.1f}{_format_mb(peak):>18}")
+
+
+# --- İlk çevrilen sayfa ---
+def extract_images_eager(cbz_path, spool_dir):
+    """Eski app.py'deki çıkarma: hat başlamadan tüm sayfalar çözülüp PNG olarak diske yazılır (karşılaştırma için kopya)."""
+    image_paths = []
+    with zipfile.ZipFile(cbz_path) as archive:
+        for name in sorted(archive.namelist()):
+            if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                img = Image.open(io.BytesIO(archive.read(name))).convert("RGB")
+                path = os.path.join(spool_dir, f"{len(image_paths):05d}.png")
+                img.save(path, format="PNG")
+                image_paths.append(path)
+    return image_paths
+
+
+def _time_to_first_page(page_items, translator, started):
+    """Hattı ilk sayfa bitene kadar çalıştırır; başlangıçtan o ana kadar geçen süreyi döndürür."""
+    for event in translator.build_pipeline(False, prefilter=False).run(page_items):
+        if event[0] == 'page' and event[2]['status'] == 'done':
+            return time.perf_counter() - started
+    return None
+
+
+def _first_page_eager(cbz_path, run_dir, latency):
+    translator, _ = fake_translator(run_dir, latency=latency)
+    started = time.perf_counter()
+    image_paths = extract_images_eager(cbz_path, run_dir)
+
+    def page_items():
+        for idx, path in enumerate(image_paths):
+            with open(path, "rb") as f:
+                data = f.read()
+            yield idx, {'idx': idx, 'status': 'pending', 'log': '', 'data': data, 'out_path': os.path.join(run_dir, f"{idx:05d}_tr.jpg")}
+
+    return _time_to_first_page(page_items(), translator, started)
+
+
+def _first_page_lazy(cbz_path, run_dir, latency):
+    translator, _ = fake_translator(run_dir, latency=latency)
+    started = time.perf_counter()
+    with open(cbz_path, "rb") as source_file:
+        source = open_page_source(source_file, cbz_path)
+
+        def page_items():
+            for idx, data, _, _ in iter_pages(source):
+                yield idx, {'idx': idx, 'status': 'pending', 'log': '', 'data': data, 'out_path': os.path.join(run_dir, f"{idx:05d}_tr.jpg")}
+
+        try:
+            return _time_to_first_page(page_items(), translator, started)
+        finally:
+            source.close()
+
+
+def bench_first_page(options, work_dir):
+    cbz_path = write_cbz(os.path.join(work_dir, "cilt.cbz"), options.cbz_pages)
+    print(f"İlk çevrilen sayfa ({options.cbz_pages} sayfalık CBZ, {os.path.getsize(cbz_path) / 2**20:.0f} MB, gecikme {options.latency}s)")
+    print(f"{'yöntem':>26}{'ilk sayfa (s)':>15}{'tepe bellek (MB)':>18}")
+    for label, func in (("önce tümü PNG'ye (eski)", _first_page_eager), ("istendikçe okuma", _first_page_lazy)):
+        elapsed, peak = isolated(func, cbz_path, tempfile.mkdtemp(dir=work_dir), options.latency)
+        print(f"{label:>26}{elapsed:>15.2f}{_format_mb(peak):>18}")
+
+
+SCENARIOS = {
+    'workers': bench_workers,
+    'batch': bench_batch,
+    'font_fit': bench_font_fit,
+    'render': bench_render,
+    'corpus': bench_corpus,
+    'viewer': bench_viewer,
+    'export': bench_export,
+    'first_page': bench_first_page,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Çeviri hattını sahte Gemini modeliyle ölçer.")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="Yalnızca bu senaryoları çalıştır (varsayılan: hepsi)")
+    parser.add_argument("--pages", type=int, default=24, help="Sayfa/dakika ve toplu istek ölçümlerindeki sayfa sayısı")
+    parser.add_argument("--latency", type=float, default=0.5, help="Sahte modelin istek başına gecikmesi (saniye)")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05, help="429 ile reddedilen isteklerin oranı")
+    parser.add_argument("--requests-per-minute", type=float, default=60, help="Anahtar başına dakikadaki istek sınırı")
+    parser.add_argument("--bubbles", type=int, default=200, help="Font sığdırma ölçümündeki balon sayısı")
+    parser.add_argument("--corpus-files", type=int, default=4, help="Derlem ölçümündeki CBZ dosyası sayısı")
+    parser.add_argument("--corpus-pages", type=int, default=16, help="Derlemdeki dosya başına sayfa sayısı")
+    parser.add_argument("--viewer-pages", type=int, default=200, help="Okuyucu ölçümündeki bölümün sayfa sayısı")
+    parser.add_argument("--export-pages", type=int, default=200, help="Dışa aktarma ölçümündeki sayfa sayısı")
+    parser.add_argument("--cbz-pages", type=int, default=500, help="İlk sayfa ölçümündeki CBZ'nin sayfa sayısı")
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="manga_bench_") as work_dir:
+        for name in options.only or SCENARIOS:
+            SCENARIOS[name](options, work_dir)
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,260 @@
+"""Komut satırından toplu çeviri.
+
+Bir klasördeki ya da glob deseniyle seçilen PDF/ZIP/CBZ/CBR dosyalarını
+Streamlit olmadan çevirir ve her birini çıktı klasörüne PDF (ya da CBZ)
+olarak yazar.
+Dosyalar süreç havuzunda paralel işlenir; her süreç içinde sayfalar
+PagePipeline ile eşzamanlı çevrilir. Çıktısı zaten olan dosyalar atlanır.
+
+Örnek:
+    python cli.py arsiv/ "indirilenler/*.cbz" -o cevrilenler --jobs 4
+
+API anahtarları sırasıyla --api-key, GEMINI_API_KEYS ortam değişkeni
+(virgülle ayrılmış) ya da .streamlit/secrets.toml içindeki API_KEYS'ten okunur.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from exporter import IncrementalExporter
+from metrics import profile_call
+from page_cache import TranslationCache
+from page_source import PageSpool, iter_pages, open_page_source
+from pipeline import KeyPool
+from translation_memory import TranslationMemory, series_from_filename
+from translator import Translator, create_model
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.zip', '.cbz', '.rar', '.cbr')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(BASE_DIR, ".cache", "translations.sqlite")
+DEFAULT_MEMORY_PATH = os.path.join(BASE_DIR, ".cache", "translation_memory.sqlite")
+SECRETS_PATH = os.path.join(BASE_DIR, ".streamlit", "secrets.toml")
+
+
+def load_api_keys(cli_keys):
+    if cli_keys:
+        return cli_keys
+    env_keys = os.environ.get("GEMINI_API_KEYS", "")
+    if env_keys.strip():
+        return [key.strip() for key in env_keys.split(",") if key.strip()]
+    if os.path.exists(SECRETS_PATH):
+        import tomllib
+        with open(SECRETS_PATH, "rb") as f:
+            return list(tomllib.load(f).get("API_KEYS", []))
+    return []
+
+
+def collect_inputs(patterns):
+    """Klasörleri, glob desenlerini ve dosya yollarını desteklenen dosyaların sıralı listesine açar."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths += [os.path.join(root, name) for name in names if name.lower().endswith(SUPPORTED_EXTENSIONS)]
+        else:
+            paths += [path for path in glob.glob(pattern) if path.lower().endswith(SUPPORTED_EXTENSIONS)]
+    return sorted(set(os.path.abspath(path) for path in paths))
+
+
+def output_path_for(path, output_dir, output_format):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + "." + output_format)
+
+
+def create_translator(options):
+    # model_factory yalnızca ölçüm betiğinde sahte model vermek için kullanılır; süreçlere gönderildiği için picklable olmalıdır
+    key_pool = KeyPool(options['api_keys'], options.get('model_factory', create_model), requests_per_minute=options['requests_per_minute'])
+    return Translator(key_pool, TranslationCache(options['cache_path']), make_previews=False, memory=TranslationMemory(options['memory_path']))
+
+
+def translate_file(path, output_path, options):
+    """Tek dosyayı çevirir; tüm sayfalar başarılıysa çıktıyı yazar. (yol, biten, toplam) döndürür.
+
+    Sayfalar bittikçe geçici klasördeki PDF/CBZ'ye eklenir; sonda yalnızca taşınır.
+    """
+    name = os.path.basename(path)
+    series = options['series'] or series_from_filename(name)
+
+    def log(message):
+        if options['verbose']:
+            print(f"[{name}] {message}", file=sys.stderr, flush=True)
+
+    translator = create_translator(options)
+    spool = PageSpool()
+    export_path = spool.path("cikti." + options['format'])
+    if options['format'] == 'cbz':
+        exporter = IncrementalExporter(None, export_path)
+    else:
+        exporter = IncrementalExporter(export_path)
+    try:
+        with open(path, "rb") as source_file:
+            source = open_page_source(source_file, name)
+            try:
+                pages = {idx: {'status': 'pending', 'log': '', 'translated_img_path': None} for idx in range(len(source))}
+
+                pipeline = translator.build_pipeline(options['batch_mode'], render_workers=options['render_workers'], prefilter=options['prefilter'], series=series)
+
+                def pages_to_run():
+                    for idx, data, ext, error in iter_pages(source, metrics=pipeline.metrics):
+                        if error is not None:
+                            pages[idx].update(idx=idx, status='error', log=f'Sayfa okunamadı: {error}')
+                            log(f"HATA: Sayfa {idx+1} okunamadı: {error}")
+                        else:
+                            pages[idx].update(idx=idx, data=data, out_path=spool.path(f"{idx:05d}_tr.jpg"))
+                        yield idx, pages[idx]
+
+                for event in pipeline.run(pages_to_run()):
+                    if event[0] == 'log':
+                        log(event[1])
+                        continue
+                    _, idx, page = event
+                    page.pop('img', None)
+                    page.pop('img_api', None)
+                    page.pop('img_blob', None)
+                    if page['status'] == 'done':
+                        exporter.add(idx, page['translated_img_path'])
+                    else:
+                        print(f"[{name}] Sayfa {idx+1} başarısız: {page['log']}", file=sys.stderr, flush=True)
+            finally:
+                source.close()
+        exporter.close()
+        if options['metrics']:
+            if series:
+                memory_stats = translator.memory.stats(series)
+                memory_line = (f"Çeviri belleği ({series}): {memory_stats['entries']} replik, {memory_stats['terms']} terim, "
+                               f"isabet oranı %{memory_stats['hit_rate'] * 100:.0f}, ~{memory_stats['tokens_saved']} token tasarruf")
+            else:
+                memory_line = "Çeviri belleği: kapalı (seri adı verilmedi ve dosya adından tahmin edilemedi)"
+            print(f"[{name}] Ölçümler:\n{translator.metrics.format_table()}\n{memory_line}", file=sys.stderr, flush=True)
+        if len(exporter) and len(exporter) == len(pages):
+            # Yarım dosya "bitmiş" sayılmasın diye önce geçici ada taşınır
+            temp_path = output_path + ".part"
+            shutil.move(export_path, temp_path)
+            os.replace(temp_path, output_path)
+        return path, len(exporter), len(pages)
+    finally:
+        exporter.close()
+        spool.cleanup()
+
+
+def profile_page(path, page_number, output_dir, options):
+    """Dosyanın tek bir sayfasını tüm aşamalardan profil altında geçirir; profil dosyasının yolunu döndürür."""
+    translator = create_translator(options)
+    spool = PageSpool()
+    try:
+        with open(path, "rb") as source_file:
+            source = open_page_source(source_file, os.path.basename(path))
+            idx = page_number - 1
+            try:
+                data, ext = source.read(idx)
+            finally:
+                source.close()
+        page = {'idx': idx, 'status': 'pending', 'log': '', 'data': data, 'out_path': spool.path(f"{idx:05d}_tr.jpg")}
+        stem = os.path.splitext(os.path.basename(path))[0]
+        profile_path, page = profile_call(lambda: translator.process_page(page, prefilter=options['prefilter'], series=options['series'] or series_from_filename(path)), os.path.join(output_dir, f"{stem}_sayfa{page_number}"))
+        print(translator.metrics.format_table(), file=sys.stderr)
+        return profile_path
+    finally:
+        spool.cleanup()
+
+
+def translate_files(todo, options, jobs):
+    """(girdi, çıktı) çiftlerini süreç havuzunda çevirir ve sonuçları yazar; (biten sayfa, başarısız dosya) döndürür."""
+    total_pages = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(translate_file, path, output_path, options): path for path, output_path in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                _, done, total = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"HATA: {path}: {e}", file=sys.stderr)
+                continue
+            total_pages += done
+            if done == total:
+                print(f"Tamamlandı: {path} ({total} sayfa)")
+            else:
+                failed += 1
+                print(f"Eksik: {path} ({done}/{total} sayfa çevrildi, çıktı yazılmadı)")
+    return total_pages, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manga dosyalarını Streamlit olmadan toplu çevirir.")
+    parser.add_argument("inputs", nargs="+", help="Klasör, dosya ya da glob deseni")
+    parser.add_argument("-o", "--output-dir", required=True, help="Çevrilen PDF'lerin yazılacağı klasör")
+    parser.add_argument("-f", "--format", choices=("pdf", "cbz"), default="pdf", help="Çıktı biçimi")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="Aynı anda işlenecek dosya (süreç) sayısı")
+    parser.add_argument("--api-key", action="append", dest="api_keys", help="Gemini API anahtarı (birden çok kez verilebilir)")
+    parser.add_argument("--requests-per-minute", type=float, default=10, help="Anahtar başına dakikadaki istek sınırı (tüm süreçler toplamı)")
+    parser.add_argument("--no-batch", action="store_true", help="Sayfa başına ayrı tespit ve çeviri istekleri kullan")
+    parser.add_argument("--no-prefilter", action="store_true", help="Yerel metin ön filtresini kapat; her sayfa tam olarak gönderilir")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Çeviri önbelleği SQLite dosyası")
+    parser.add_argument("--memory", default=DEFAULT_MEMORY_PATH, help="Seri bazında çeviri belleği SQLite dosyası")
+    parser.add_argument("--series", help="Tüm dosyalar için seri adı (verilmezse dosya adında bölüm/cilt numarası varsa ondan tahmin edilir; yoksa bellek kullanılmaz)")
+    parser.add_argument("--force", action="store_true", help="Çıktısı olan dosyaları da yeniden çevir")
+    parser.add_argument("--metrics", action="store_true", help="Her dosyadan sonra aşama sürelerini ve sayaçları stderr'e yaz")
+    parser.add_argument("--profile-page", type=int, metavar="N", help="Yalnızca ilk dosyanın N. sayfasını profil altında çevir (pyinstrument varsa HTML, yoksa .prof)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Hat loglarını stderr'e yaz")
+    args = parser.parse_args(argv)
+
+    api_keys = load_api_keys(args.api_keys)
+    if not api_keys:
+        parser.error("API anahtarı bulunamadı (--api-key, GEMINI_API_KEYS ya da .streamlit/secrets.toml).")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    files = collect_inputs(args.inputs)
+    if args.profile_page:
+        if not files:
+            parser.error("Profil için girdi dosyası bulunamadı.")
+        options = {
+            'api_keys': api_keys,
+            'requests_per_minute': args.requests_per_minute,
+            'cache_path': args.cache,
+            'memory_path': args.memory,
+            'series': args.series,
+            'prefilter': not args.no_prefilter,
+        }
+        print(f"Profil yazıldı: {profile_page(files[0], args.profile_page, args.output_dir, options)}")
+        return 0
+    todo = []
+    for path in files:
+        output_path = output_path_for(path, args.output_dir, args.format)
+        if os.path.exists(output_path) and not args.force:
+            print(f"Atlandı (zaten çevrilmiş): {path}")
+            continue
+        todo.append((path, output_path))
+    if not todo:
+        print("Çevrilecek dosya yok.")
+        return 0
+
+    jobs = max(1, min(args.jobs, len(todo)))
+    options = {
+        'api_keys': api_keys,
+        # Anahtarlar tüm süreçlerce paylaşıldığından hız sınırı süreçlere bölünür
+        'requests_per_minute': args.requests_per_minute / jobs,
+        'batch_mode': not args.no_batch,
+        'prefilter': not args.no_prefilter,
+        'format': args.format,
+        'cache_path': args.cache,
+        'memory_path': args.memory,
+        'series': args.series,
+        'render_workers': max(1, (os.cpu_count() or 1) // jobs),
+        'metrics': args.metrics,
+        'verbose': args.verbose,
+    }
+    started = time.monotonic()
+    total_pages, failed = translate_files(todo, options, jobs)
+    elapsed = time.monotonic() - started
+    rate = total_pages / elapsed * 60 if elapsed > 0 else 0
+    print(f"{len(todo) - failed}/{len(todo)} dosya, {total_pages} sayfa, {elapsed:.1f}sn ({rate:.1f} sayfa/dk)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Çevrilen sayfaları bittikçe diske ekleyen PDF/CBZ dışa aktarıcı.
+
+Sayfalar bitiş sırasıyla gelir ama belgede sayfa sırasıyla yer alır: her
+sayfa, kendisinden önceki dışa aktarılmış sayfaların sayısı kadar ileriye
+eklenir. PDF artımlı kaydedildiği için her ekleme yalnızca yeni sayfanın
+baytlarını dosyanın sonuna yazar; görseller (JPEG) yeniden kodlanmadan
+gömülür. Hiçbir aşamada sayfalar bellekte toplu tutulmaz.
+
+Aynı açık belgeye art arda `saveIncr` yapmak üçüncü sayfadan sonra bozuk
+(açılırken onarılan) bir dosya yazar; onarılmış dosyaya da artık artımlı
+yazılamaz. Bu yüzden belge her kayıttan sonra kapatılıp yeniden açılır,
+onarılmış bir dosya bulunursa bir kez baştan yazılır.
+"""
+import bisect
+import os
+import zipfile
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+class IncrementalExporter:
+    """`add` ile verilen sayfaları PDF'e ve/veya CBZ'ye sıralı olarak ekler.
+
+    Yolu None verilen biçim hiç üretilmez (ör. yalnızca CBZ isteyen komut
+    satırı PDF işini yapmaz); en az biri verilmelidir. `exported`, önceki
+    çalışmada dışa aktarılmış sayfa index'leridir. Diskteki dosyalar bu
+    listeyle uyuşmuyorsa dosyalar sıfırdan başlatılır ve `exported` boşalır;
+    çağıran taraf bitmiş sayfaları yeniden eklemelidir.
+    """
+
+    def __init__(self, pdf_path, cbz_path=None, exported=()):
+        if not pdf_path and not cbz_path:
+            raise ValueError("PDF ya da CBZ yolundan en az biri verilmeli.")
+        self.pdf_path = pdf_path
+        self.cbz_path = cbz_path
+        self.exported = sorted(exported)
+        self.doc = None
+        if not self._reopen():
+            self._reset()
+
+    def _reopen(self):
+        if not self.exported:
+            return False
+        doc = None
+        if self.pdf_path:
+            if not os.path.exists(self.pdf_path):
+                return False
+            try:
+                doc = fitz.open(self.pdf_path)
+            except Exception:
+                return False
+            if doc.page_count != len(self.exported):
+                doc.close()
+                return False
+        if self.cbz_path:
+            expected = {self._cbz_prefix(idx) for idx in self.exported}
+            try:
+                with zipfile.ZipFile(self.cbz_path) as archive:
+                    names = {os.path.splitext(name)[0] for name in archive.namelist()}
+            except Exception:
+                names = set()
+            if names != expected:
+                if doc is not None:
+                    doc.close()
+                return False
+        self.doc = doc
+        return True
+
+    def _reset(self):
+        self.exported = []
+        for path in (self.pdf_path, self.cbz_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        # Sayfasız PDF kaydedilemez; dosya ilk sayfa eklendiğinde oluşturulur
+        self.doc = fitz.open() if self.pdf_path else None
+
+    @staticmethod
+    def _cbz_prefix(idx):
+        return f"{idx+1:04d}"
+
+    def __len__(self):
+        return len(self.exported)
+
+    def add(self, idx, image_path):
+        """Sayfayı sırasındaki yere ekler; daha önce eklenmişse bir şey yapmaz."""
+        position = bisect.bisect_left(self.exported, idx)
+        if position < len(self.exported) and self.exported[position] == idx:
+            return
+        with open(image_path, "rb") as f:
+            data = f.read()
+        if self.pdf_path:
+            try:
+                self._add_pdf_page(position, data, image_path)
+            except Exception:
+                # Kaydedilmemiş sayfa bellekteki belgede kalırsa sonraki sayfaların yeri kayar
+                self._discard_unsaved()
+                raise
+        self.exported.insert(position, idx)
+        if self.cbz_path:
+            with zipfile.ZipFile(self.cbz_path, "a", compression=zipfile.ZIP_STORED) as archive:
+                archive.writestr(self._cbz_prefix(idx) + os.path.splitext(image_path)[1].lower(), data)
+
+    def _add_pdf_page(self, position, data, image_path):
+        with Image.open(image_path) as img:
+            width, height = img.size
+        # Pillow'un PDF çıktısı gibi 72 dpi: bir piksel bir punto
+        page = self.doc.new_page(pno=position, width=width, height=height)
+        page.insert_image(page.rect, stream=data)
+        if self.doc.name and not self.doc.is_repaired:
+            self.doc.saveIncr()
+            self.doc.close()
+        else:
+            # Yeni ya da onarılmış belge: tamamı geçici dosyaya yazılıp yerine taşınır
+            temp_path = self.pdf_path + ".tmp"
+            self.doc.save(temp_path, garbage=1)
+            self.doc.close()
+            os.replace(temp_path, self.pdf_path)
+        self.doc = fitz.open(self.pdf_path)
+
+    def _discard_unsaved(self):
+        if self.doc is not None:
+            self.doc.close()
+        self.doc = fitz.open(self.pdf_path) if os.path.exists(self.pdf_path) else fitz.open()
+
+    def close(self):
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
@@ -0,0 +1,134 @@
+"""Gemini yerine kullanılan sahte model: testler ve ölçüm betikleri için.
+
+`FakeModelFactory`, `KeyPool`'a `model_factory` olarak verilir ve her
+anahtar için bir `FakeModel` üretir. Model gerçek API'ye çıkmaz; istenen
+gecikmeyi bekler, istenirse 429 ya da akış ortasında bağlantı hatası üretir
+ve yanıt metnini `responder(content)` ile oluşturur. Varsayılan yanıtlar
+tespit, çeviri ve toplu istek promptlarının beklediği biçimdedir.
+
+Gerçek API'deki gibi akışlı istekte 429 ilk parça okunurken gelir.
+"""
+import json
+import random
+import threading
+import time
+
+FAKE_BLOCKS_PER_PAGE = 2
+FAKE_CHUNK_SIZE = 64
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeRateLimit(Exception):
+    def __init__(self):
+        super().__init__("429 Resource has been exhausted (sahte model)")
+
+
+def _image_count(content):
+    return sum(1 for part in content if isinstance(part, dict))
+
+
+def _fake_block(number, translated):
+    top = 100 + number * 300
+    block = {'text': f"METİN {number + 1}", 'box': [top, 100, top + 200, 600]}
+    if translated:
+        block['translation'] = f"ÇEVİRİ {number + 1}"
+    return block
+
+
+def default_response(content):
+    """İsteğin türüne göre geçerli bir yanıt metni üretir.
+
+    Düz metin istek çeviri sayılır ve '---' ile ayrılmış blok sayısı kadar
+    çeviri döner; birden çok görsel içeren istek toplu istektir ve her sayfa
+    için bir girdi döner; tek görselli istek tespit isteğidir.
+    """
+    if isinstance(content, str):
+        # Çeviri promptunda bloklar, son boş satırdan sonra '---' ile ayrılır
+        blocks = content.rsplit("\n\n", 1)[-1].split("\n---\n")
+        return "\n---\n".join(f"ÇEVİRİ {number + 1}" for number in range(len(blocks)))
+    pages = _image_count(content)
+    if pages > 1:
+        return "```json\n" + json.dumps([
+            {'page': page, 'blocks': [_fake_block(number, True) for number in range(FAKE_BLOCKS_PER_PAGE)], 'terms': []}
+            for page in range(1, pages + 1)
+        ], ensure_ascii=False) + "\n```"
+    return json.dumps([_fake_block(number, False) for number in range(FAKE_BLOCKS_PER_PAGE)], ensure_ascii=False)
+
+
+class FakeModel:
+    """`generate_content` ile Gemini modelini taklit eder.
+
+    `latency` her isteğin ilk parçasından önce beklenen süredir (saniye).
+    `rate_limits` ilk kaç isteğin 429 ile reddedileceği, `rate_limit_ratio`
+    sonraki isteklerin hangi oranda reddedileceğidir. `break_after`
+    verilirse akış o kadar karakterden sonra bağlantı hatasıyla kesilir.
+    """
+
+    def __init__(self, api_key=None, latency=0.0, rate_limits=0, rate_limit_ratio=0.0, responder=default_response,
+                 break_after=None, chunk_size=FAKE_CHUNK_SIZE, seed=None):
+        self.api_key = api_key
+        self.latency = latency
+        self.rate_limits = rate_limits
+        self.rate_limit_ratio = rate_limit_ratio
+        self.responder = responder
+        self.break_after = break_after
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.rejected = 0
+
+    def _admit(self):
+        """İsteği sayar; 429 ile reddedilecekse True döndürür."""
+        with self.lock:
+            self.calls += 1
+            rejected = self.calls <= self.rate_limits or self.random.random() < self.rate_limit_ratio
+            self.rejected += rejected
+            return rejected
+
+    def generate_content(self, content, stream=False):
+        rejected = self._admit()
+        text = self.responder(content)
+        if not stream:
+            time.sleep(self.latency)
+            if rejected:
+                raise FakeRateLimit()
+            return FakeChunk(text)
+        return self._stream(text, rejected)
+
+    def _stream(self, text, rejected):
+        time.sleep(self.latency)
+        if rejected:
+            raise FakeRateLimit()
+        end = len(text) if self.break_after is None else min(len(text), self.break_after)
+        for start in range(0, end, self.chunk_size):
+            yield FakeChunk(text[start:min(end, start + self.chunk_size)])
+        if end < len(text):
+            raise ConnectionError("Bağlantı koptu (sahte model)")
+
+
+class FakeModelFactory:
+    """Her API anahtarı için aynı ayarlarla bir `FakeModel` üretir; çağrıları toplar."""
+
+    def __init__(self, **options):
+        self.options = options
+        self.models = []
+        self.lock = threading.Lock()
+
+    def __call__(self, api_key):
+        with self.lock:
+            model = FakeModel(api_key, seed=len(self.models), **self.options)
+            self.models.append(model)
+            return model
+
+    @property
+    def calls(self):
+        return sum(model.calls for model in self.models)
+
+    @property
+    def rejected(self):
+        return sum(model.rejected for model in self.models)
@@ -0,0 +1,328 @@
+"""Streamlit yeniden çalıştırmalarından bağımsız arka plan çeviri işleri.
+
+Her yükleme, içeriğinin özetinden türeyen bir kimliğe sahip bir iş olur;
+seçenekler kimliğe girmez, iş ilk gönderildiği seçeneklerle sürer. Böylece
+yükleme sonrası değişen kenar çubuğu ayarları ikinci bir tam iş başlatıp
+havuzda yer tutmaz.
+İşler süreç düzeyindeki bir iş havuzunda çalışır; eşzamanlı iş sayısı bu
+havuzun boyutuyla sınırlanır. Sayfa durumları iş klasöründeki status.json
+dosyasına yazılır; sunucu yeniden başlasa bile iş, bitmemiş ilk sayfadan
+devam ettirilir. Arayüz yalnızca işin anlık görüntüsünü okur.
+"""
+import collections
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from exporter import IncrementalExporter
+from page_source import PageSpool, iter_pages, open_page_source
+from preview import preview_path_for, save_preview
+
+PERSISTED_FIELDS = ('status', 'log', 'translated_img_path', 'preview_path', 'cached')
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+LOG_LIMIT = 1000
+SAVE_INTERVAL = 1.0
+
+
+def job_id_for(data):
+    """Dosya içeriğinden kararlı bir iş kimliği üretir."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class Job:
+    """Tek bir dosyanın çeviri işi; sayfa durumlarını diskte tutar."""
+
+    def __init__(self, job_id, job_dir, filename, options, pages, state='queued', exported=()):
+        self.id = job_id
+        self.dir = job_dir
+        self.spool = PageSpool(job_dir)
+        self.filename = filename
+        self.options = options
+        self.pages = pages
+        self.state = state
+        self.future = None
+        self.logs = collections.deque(maxlen=LOG_LIMIT)
+        self.log_count = 0
+        self.lock = threading.Lock()
+        self.last_save = 0.0
+        self.exported = list(exported)
+
+    @property
+    def source_path(self):
+        return os.path.join(self.dir, "source" + os.path.splitext(self.filename)[1].lower())
+
+    @property
+    def status_path(self):
+        return os.path.join(self.dir, "status.json")
+
+    def export_path(self, kind):
+        """Dışa aktarılan dosyanın yolu; `kind` 'pdf' ya da 'cbz'."""
+        return os.path.join(self.dir, f"cevrilen_sayfalar.{kind}")
+
+    @classmethod
+    def load(cls, job_dir):
+        with open(os.path.join(job_dir, "status.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        pages = {int(idx): page for idx, page in data['pages'].items()}
+        return cls(data['id'], job_dir, data['filename'], data['options'], pages, data['state'], data.get('exported', ()))
+
+    def save(self):
+        """Durumu atomik olarak diske yazar."""
+        with self.lock:
+            data = {
+                'id': self.id,
+                'filename': self.filename,
+                'options': self.options,
+                'state': self.state,
+                'exported': self.exported,
+                'pages': {idx: {field: page.get(field) for field in PERSISTED_FIELDS} for idx, page in self.pages.items()},
+            }
+        temp_path = self.status_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.status_path)
+        self.last_save = time.monotonic()
+
+    def log(self, message):
+        with self.lock:
+            self.logs.append(message)
+            self.log_count += 1
+
+    def logs_since(self, cursor):
+        """`cursor`'dan sonraki log mesajlarını ve yeni imleci döndürür."""
+        with self.lock:
+            first = self.log_count - len(self.logs)
+            skip = max(cursor, first) - first
+            return list(self.logs)[skip:], self.log_count
+
+    def snapshot(self):
+        """İşin durumunu ve sayfaların kopyasını döndürür."""
+        with self.lock:
+            pages = {idx: {field: page.get(field) for field in PERSISTED_FIELDS} for idx, page in self.pages.items()}
+            return self.state, pages
+
+    def unfinished(self):
+        with self.lock:
+            return [idx for idx, page in sorted(self.pages.items()) if page['status'] != 'done']
+
+    def _iter_pages(self, source, indices, metrics):
+        for idx, data, ext, error in iter_pages(source, indices, metrics):
+            page = self.pages[idx]
+            page['idx'] = idx
+            if error is not None:
+                page['status'] = 'error'
+                page['log'] = f'Sayfa okunamadı: {error}'
+                self.log(f"HATA: Sayfa {idx+1} okunamadı: {error}")
+                yield idx, page
+                continue
+            page['out_path'] = self.spool.path(f"{idx:05d}_tr.jpg")
+            page['data'] = data
+            yield idx, page
+
+    def original_preview(self, idx):
+        """Sayfanın orijinalinin önizleme yolu; sayfa okunamıyorsa None.
+
+        Orijinal baytlar iş klasörüne kopyalanmaz (kaynak dosya zaten orada);
+        hatalı sayfa gösterilirken kaynaktan okunur ve yalnızca küçük önizlemesi saklanır.
+        """
+        path = self.spool.path(f"{idx:05d}_orijinal.jpg")
+        preview_path = preview_path_for(path)
+        if os.path.exists(preview_path):
+            return preview_path
+        try:
+            with open(self.source_path, "rb") as source_file:
+                source = open_page_source(source_file, self.filename)
+                try:
+                    data, _ = source.read(idx)
+                finally:
+                    source.close()
+            with Image.open(io.BytesIO(data)) as img:
+                return save_preview(img, path)
+        except Exception:
+            return None
+
+    def export_ready(self, kind):
+        """Dışa aktarılan dosyada en az bir sayfa varsa True; dosya okunmaz."""
+        with self.lock:
+            return bool(self.exported) and os.path.exists(self.export_path(kind))
+
+    def export_snapshot(self, kind):
+        """Dışa aktarılan dosyanın tutarlı bir kopyasını döndürür; henüz sayfa yoksa None.
+
+        Yazıcı dosyaya ekleme yaparken yarım okuma olmaması için kilit altında okunur.
+        Dosyanın tamamı belleğe alındığından yalnızca indirme istendiğinde çağrılmalıdır.
+        """
+        with self.lock:
+            if not self.exported or not os.path.exists(self.export_path(kind)):
+                return None
+            with open(self.export_path(kind), "rb") as f:
+                return f.read()
+
+    def _export(self, exporter, idx, page):
+        """Sayfayı dışa aktarır; başarısız olursa sayfa hata sayılır (tekrar denenebilir) ve False döner."""
+        with self.lock:
+            try:
+                exporter.add(idx, page['translated_img_path'])
+            except Exception as e:
+                page['status'] = 'error'
+                page['log'] = f'Sayfa dışa aktarılamadı: {e}'
+                return False
+            self.exported = list(exporter.exported)
+        return True
+
+    def run(self, pipeline_factory):
+        """Bitmemiş sayfaları hattan geçirir; biten her sayfayı dışa aktarır ve durumu kaydeder."""
+        with self.lock:
+            self.state = 'running'
+            for page in self.pages.values():
+                if page['status'] != 'done':
+                    page['status'] = 'pending'
+        self.save()
+        todo = self.unfinished()
+        if todo:
+            self.log(f"İş {self.id}: {len(todo)} sayfa işlenecek (ilk: Sayfa {todo[0]+1}).")
+        exporter = None
+        try:
+            with self.lock:
+                exporter = IncrementalExporter(self.export_path('pdf'), self.export_path('cbz'), self.exported)
+            # Dışa aktarım dosyaları yeniden başlatıldıysa bitmiş sayfaları tekrar ekle
+            for idx, page in sorted(self.pages.items()):
+                if page['status'] == 'done' and not self._export(exporter, idx, page):
+                    self.log(f"HATA: Sayfa {idx+1} dışa aktarılamadı: {page['log']}")
+            with open(self.source_path, "rb") as source_file:
+                source = open_page_source(source_file, self.filename)
+                try:
+                    pipeline = pipeline_factory(self.options)
+                    for event in pipeline.run(self._iter_pages(source, todo, pipeline.metrics)):
+                        if event[0] == 'log':
+                            self.log(event[1])
+                            continue
+                        _, idx, page = event
+                        # Bellekteki görselleri bırak, sonuç iş klasöründe duruyor
+                        page.pop('img', None)
+                        page.pop('img_api', None)
+                        page.pop('data', None)
+                        page.pop('img_blob', None)
+                        # Önce dışa aktarılır; dosyada olmayan sayfa "bitti" diye kaydedilmez
+                        if page['status'] == 'done' and not self._export(exporter, idx, page):
+                            self.log(f"HATA: Sayfa {idx+1} dışa aktarılamadı: {page['log']}")
+                        with self.lock:
+                            self.pages[idx] = page
+                        if time.monotonic() - self.last_save >= SAVE_INTERVAL:
+                            self.save()
+                finally:
+                    source.close()
+        except Exception as e:
+            self.log(f"HATA: İş {self.id} yarıda kaldı: {e}")
+        finally:
+            with self.lock:
+                self.state = 'finished'
+                if exporter is not None:
+                    exporter.close()
+                # Hat erken durduysa (ör. kaynak okunamadı) kalan sayfalar sonsuza dek
+                # "bekliyor" görünmesin; hata sayılır ve tekrar denenebilir
+                stranded = [idx for idx, page in sorted(self.pages.items()) if page['status'] not in ('done', 'error')]
+                for idx in stranded:
+                    self.pages[idx]['status'] = 'error'
+                    self.pages[idx]['log'] = 'Sayfa işlenemeden iş sona erdi.'
+            if stranded:
+                self.log(f"UYARI: İş {self.id}: {len(stranded)} sayfa işlenemeden iş sona erdi (ilk: Sayfa {stranded[0]+1}); tekrar denenebilir.")
+            self.save()
+
+
+class JobManager:
+    """Süreç boyunca yaşayan iş havuzu; eşzamanlı iş sayısını sınırlar.
+
+    `pipeline_factory(options)` her iş için yeni bir PagePipeline döndürür.
+    """
+
+    def __init__(self, root, pipeline_factory, max_concurrent_jobs=2, retention_hours=72):
+        self.root = root
+        self.pipeline_factory = pipeline_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="ceviri-isi")
+        self.jobs = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.prune(retention_hours)
+
+    def prune(self, retention_hours):
+        """Son güncellemesi `retention_hours` saatten eski iş klasörlerini siler."""
+        limit = time.time() - retention_hours * 3600
+        for name in os.listdir(self.root):
+            job_dir = os.path.join(self.root, name)
+            status_path = os.path.join(job_dir, "status.json")
+            if os.path.isdir(job_dir) and (not os.path.exists(status_path) or os.path.getmtime(status_path) < limit):
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _load(self, job_id):
+        job_dir = os.path.join(self.root, job_id)
+        if not os.path.exists(os.path.join(job_dir, "status.json")):
+            return None
+        job = Job.load(job_dir)
+        self.jobs[job_id] = job
+        return job
+
+    def _create(self, job_id, data, filename, options):
+        job_dir = os.path.join(self.root, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        job = Job(job_id, job_dir, filename, options, {})
+        with open(job.source_path, "wb") as f:
+            f.write(data)
+        try:
+            with open(job.source_path, "rb") as source_file:
+                source = open_page_source(source_file, filename)
+                if source is None:
+                    raise ValueError(f"Desteklenmeyen dosya türü: {filename}")
+                page_count = len(source)
+                source.close()
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        job.pages = {idx: {'status': 'pending', 'log': '', 'img_path': None, 'translated_img_path': None} for idx in range(page_count)}
+        job.save()
+        self.jobs[job_id] = job
+        return job
+
+    def _start(self, job):
+        # Kayıtlı ama çalışmayan, bitmemiş iş (ör. sunucu yeniden başladı) kaldığı yerden sürer
+        if job.future is None and job.state != 'finished':
+            job.future = self.executor.submit(job.run, self.pipeline_factory)
+
+    def submit(self, data, filename, options):
+        """Dosya için işi döndürür; yoksa `options` ile oluşturup kuyruğa ekler.
+
+        Aynı dosyanın işi zaten varsa `options` yok sayılır.
+        """
+        job_id = job_id_for(data)
+        with self.lock:
+            job = self.jobs.get(job_id) or self._load(job_id) or self._create(job_id, data, filename, options)
+            self._start(job)
+        return job
+
+    def get(self, job_id):
+        """Kimliği verilen işe yeniden bağlanır; bulunamazsa None döndürür."""
+        if not JOB_ID_PATTERN.match(job_id or ""):
+            return None
+        with self.lock:
+            job = self.jobs.get(job_id) or self._load(job_id)
+            if job is not None:
+                self._start(job)
+        return job
+
+    def retry(self, job):
+        """Bitmiş işin hatalı sayfalarını yeniden kuyruğa alır."""
+        with self.lock:
+            if job.future is not None and not job.future.done():
+                return
+            with job.lock:
+                job.state = 'queued'
+            job.future = None
+            self._start(job)
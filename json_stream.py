@@ -0,0 +1,135 @@
+"""Akan model yanıtından JSON listesi öğelerini tamamlandıkça çıkaran hoşgörülü ayrıştırıcı.
+
+Gemini yanıtı parça parça geldiğinde üst düzey listenin her öğesi (ör. bir
+metin bloğu ya da toplu yanıtta bir sayfa) kapanır kapanmaz ayrıştırılır ve
+çağırana verilir; yanıtın tamamı beklenmez.
+
+- Listeden önceki ve sonraki metin (```json gibi kod blokları) yok sayılır.
+- Sondaki virgüller temizlenir; yine de ayrıştırılamayan öğe atlanır ve
+  diğer öğeler kaybolmaz.
+- Yanıt yarıda kesilirse `close` son öğenin geçerli kısmını kurtarmaya
+  çalışır: yarım kalan son alan atılır ve açık parantezler kapatılır.
+- Listeden önceki düz metindeki köşeli parantezler (ör. "Here [is] ...")
+  liste sanılmaz; ilk öğeden önce nesne olmayan bir şey gelirse aranan
+  liste o değildir ve sonraki `[` beklenir.
+
+Öğe atlandıysa, kurtarıldıysa ya da liste hiç kapanmadıysa `complete`
+False olur; böyle bir yanıt eksik sayılmalı ve önbelleğe yazılmamalıdır.
+"""
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _loads(text):
+    return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+
+
+class JsonArrayStream:
+    """`feed` ile verilen metin parçalarından üst düzey listenin tamamlanan öğelerini döndürür."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+        # Öğe içindeki virgüllerin konumu ve o anki açık parantezler (kurtarma için)
+        self.cut_points = []
+        self.items = 0
+        self.skipped = 0
+        self.recovered = 0
+        # Öğeler arasında nesne olmayan değer (ör. düz sayı ya da metin) görüldü
+        self.malformed = False
+
+    @property
+    def complete(self):
+        """Liste kapandı ve içindeki her öğe eksiksiz ayrıştırıldıysa True."""
+        return self.finished and not (self.skipped or self.recovered or self.malformed)
+
+    def feed(self, text):
+        """Yeni parçayı işler; bu parçayla tamamlanan öğelerin listesini döndürür."""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.finished:
+            char = buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif not self.started:
+                self.started = char == '['
+            elif char == '"' and self.stack:
+                self.in_string = True
+            elif char in _CLOSERS:
+                if not self.stack:
+                    self.item_start = self.pos
+                    self.cut_points = []
+                self.stack.append(char)
+            elif char in '}]':
+                if not self.stack:
+                    if char == ']':
+                        self.finished = True
+                else:
+                    self.stack.pop()
+                    if not self.stack:
+                        item = self._parse(buffer[self.item_start:self.pos + 1])
+                        if item is not None:
+                            completed.append(item)
+                        self.item_start = None
+            elif char == ',' and self.stack:
+                self.cut_points.append((self.pos - self.item_start, tuple(self.stack)))
+            elif not self.stack and char not in ', \t\r\n':
+                if self.items or self.skipped:
+                    self.malformed = True
+                else:
+                    # Düz metindeki bir köşeli paranteze takılmış; asıl liste sonra gelecek
+                    self.started = False
+            self.pos += 1
+        # Tamamlanan öğelerin metni artık gerekmez
+        keep = self.item_start if self.item_start is not None else self.pos
+        self.buffer = buffer[keep:]
+        self.pos -= keep
+        if self.item_start is not None:
+            self.item_start = 0
+        return completed
+
+    def _parse(self, text):
+        try:
+            item = _loads(text)
+        except ValueError:
+            self.skipped += 1
+            return None
+        self.items += 1
+        return item
+
+    def close(self):
+        """Akış bittiğinde yarım kalan son öğeden kurtarılabilen kısmı döndürür (liste, en fazla bir öğe)."""
+        if self.item_start is None or self.finished:
+            return []
+        fragment = self.buffer[self.item_start:]
+        attempts = [(fragment[:cut], stack) for cut, stack in reversed(self.cut_points)]
+        # Son değer yarım kalmış olabilir (ör. 970 yerine 9); ancak kapanmış bir değerle bitiyorsa olduğu gibi denenir
+        if not self.in_string and fragment.rstrip()[-1:] in ('}', ']', '"'):
+            attempts.insert(0, (fragment, tuple(self.stack)))
+        for text, stack in attempts:
+            try:
+                item = _loads(text + ''.join(_CLOSERS[opener] for opener in reversed(stack)))
+            except ValueError:
+                continue
+            self.recovered += 1
+            self.item_start = None
+            return [item]
+        self.skipped += 1
+        self.item_start = None
+        return []
+
@@ -0,0 +1,138 @@
+"""Hat için süre ölçümleri, sayaçlar ve profil çıkarma.
+
+`Metrics` iş parçacıklarından güvenle kullanılabilir: her aşama adımı
+`span` ile ölçülür, API denemeleri ve önbellek isabetleri gibi olaylar
+`count` ile sayılır. Ölçümler sınırlı bir kuyrukta tutulur; özet tablo
+olarak gösterilebilir, JSON ya da CSV olarak dışa aktarılabilir.
+"""
+import collections
+import csv
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_SPANS = 100000
+
+
+class Metrics:
+    """Aşama süreleri (span) ve olay sayaçları."""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.lock = threading.Lock()
+        self.spans = collections.deque(maxlen=max_spans)
+        self.counters = collections.Counter()
+
+    @contextmanager
+    def span(self, stage, page=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, page, time.perf_counter() - started)
+
+    def record(self, stage, page, elapsed):
+        """Başka yoldan ölçülmüş bir süreyi ekler (ör. jeneratörde bekleme hariç süre)."""
+        with self.lock:
+            self.spans.append((stage, page, elapsed))
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def reset(self):
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """Aşama başına adet, toplam, ortalama, p95 ve en uzun süreyi (ms) döndürür."""
+        with self.lock:
+            spans = list(self.spans)
+        by_stage = collections.defaultdict(list)
+        for stage, _, elapsed in spans:
+            by_stage[stage].append(elapsed)
+        rows = []
+        for stage, values in by_stage.items():
+            values.sort()
+            rows.append({
+                'stage': stage,
+                'count': len(values),
+                'total_s': round(sum(values), 3),
+                'mean_ms': round(sum(values) / len(values) * 1000, 1),
+                'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            })
+        rows.sort(key=lambda row: row['total_s'], reverse=True)
+        return rows
+
+    def counter_values(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def to_json(self):
+        with self.lock:
+            spans = [{'stage': stage, 'page': page, 'seconds': elapsed} for stage, page, elapsed in self.spans]
+        return json.dumps({'summary': self.summary(), 'counters': self.counter_values(), 'spans': spans}, ensure_ascii=False)
+
+    def to_csv(self):
+        """Her ölçüm bir satır: aşama, sayfa, saniye."""
+        with self.lock:
+            spans = list(self.spans)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['stage', 'page', 'seconds'])
+        for stage, page, elapsed in spans:
+            writer.writerow([stage, '' if page is None else page, f"{elapsed:.6f}"])
+        return buffer.getvalue()
+
+    def format_table(self):
+        """Özeti düz metin tablo olarak döndürür (komut satırı için)."""
+        lines = [f"{'aşama':<20}{'adet':>8}{'toplam sn':>12}{'ort. ms':>10}{'p95 ms':>10}{'en uzun ms':>12}"]
+        for row in self.summary():
+            lines.append(f"{row['stage']:<20}{row['count']:>8}{row['total_s']:>12}{row['mean_ms']:>10}{row['p95_ms']:>10}{row['max_ms']:>12}")
+        for name, value in sorted(self.counter_values().items()):
+            lines.append(f"{name:<20}{value:>8}")
+        return "\n".join(lines)
+
+
+def content_bytes(content):
+    """API'ye gönderilen içeriğin yaklaşık bayt boyutu (metin + görsel blob'ları)."""
+    if isinstance(content, str):
+        return len(content.encode())
+    if isinstance(content, dict):
+        return len(content.get('data', b''))
+    if isinstance(content, (list, tuple)):
+        return sum(content_bytes(part) for part in content)
+    return 0
+
+
+def profile_call(func, output_path):
+    """`func`'ı profil altında çalıştırır; pyinstrument kuruluysa HTML, değilse cProfile .prof yazar.
+
+    Yazılan dosyanın yolunu ve fonksiyonun sonucunu döndürür.
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            result = func()
+        finally:
+            profiler.stop()
+        output_path += ".html"
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        return output_path, result
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        output_path += ".prof"
+        profiler.dump_stats(output_path)
+    return output_path, result
@@ -0,0 +1,179 @@
+"""Sayfa görseli özetine göre kalıcı çeviri önbelleği.
+
+Anahtar, API'ye gönderilen (küçültülmüş) görselin bayt özeti ile algısal
+özetidir (dHash); prompt sürümü ve hedef dil de anahtarın parçasıdır. Aynı
+taramanın farklı sıkıştırılmış bir kopyası bayt özetiyle bulunamasa bile
+algısal özeti birkaç bit farkla eşleştiği için önbellekten döner.
+
+Algısal özet 4 adet 16 bitlik banda bölünerek saklanır; Hamming mesafesi
+3 veya daha az olan iki özetin en az bir bandı aynı olacağından yakın
+eşleşme araması indeksli sorgularla yapılır.
+
+dHash, aynı panel ve balonda yalnızca metni farklı olan sayfaları ayırt
+edemez. Bu yüzden yakın eşleşme, kayıtla birlikte saklanan 256x256 gri
+küçük resimle ayrıca doğrulanır. Yeniden sıkıştırılmış kopyada en büyük
+piksel farkı 15 gri seviye civarında kalırken tek bir harfi değişen
+balon bile yerel olarak 80'in üzerinde fark bırakır. Küçük resim zlib ile
+sıkıştırılarak saklanır (sayfa başına ~15 KB).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from PIL import Image, ImageChops
+
+HASH_SIZE = 8
+MAX_HAMMING_DISTANCE = 3
+BANDS = 4
+THUMB_SIZE = 256
+THUMB_MAX_DIFF = 40
+
+
+def perceptual_hash(img):
+    """64 bitlik fark özeti (dHash): yan yana piksellerin parlaklık karşılaştırması."""
+    small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def byte_hash(img):
+    """Görselin ham piksel verisinin SHA-256 özeti."""
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}{img.size}".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def thumbnail(img):
+    """Yakın eşleşmeyi doğrulamak için 256x256 gri küçük resmin sıkıştırılmış baytları."""
+    return zlib.compress(img.convert("L").resize((THUMB_SIZE, THUMB_SIZE), Image.LANCZOS).tobytes())
+
+
+def thumbnails_match(first, second):
+    """İki küçük resim arasındaki en büyük piksel farkı eşiği aşmıyorsa True."""
+    if not first or not second:
+        return False
+    size = (THUMB_SIZE, THUMB_SIZE)
+    first, second = (Image.frombytes("L", size, zlib.decompress(thumb)) for thumb in (first, second))
+    difference = ImageChops.difference(first, second)
+    return difference.getextrema()[1] <= THUMB_MAX_DIFF
+
+
+def _bands(phash):
+    return [(phash >> (16 * i)) & 0xFFFF for i in range(BANDS)]
+
+
+def _signed(value):
+    # SQLite INTEGER işaretli 64 bittir
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class TranslationCache:
+    """SQLite tabanlı, boyut sınırlı ve LRU tahliyeli çeviri önbelleği."""
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Komut satırında birden çok süreç aynı dosyayı paylaşabilir
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " sha TEXT NOT NULL, phash INTEGER NOT NULL,"
+            " band0 INTEGER, band1 INTEGER, band2 INTEGER, band3 INTEGER,"
+            " prompt_version TEXT NOT NULL, language TEXT NOT NULL,"
+            " payload TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL,"
+            " thumb BLOB,"
+            " PRIMARY KEY (sha, prompt_version, language))"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(pages)")]
+        if 'thumb' not in columns:
+            # Eski önbellek dosyası: küçük resmi olmayan kayıtlar yalnızca bayt özetiyle eşleşir
+            self.conn.execute("ALTER TABLE pages ADD COLUMN thumb BLOB")
+        for band in range(BANDS):
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_band{band} ON pages (band{band}, prompt_version, language)")
+        self.conn.commit()
+
+    def keys_for(self, img):
+        """Önbellek anahtarlarını (bayt özeti, algısal özet, küçük resim) hesaplar."""
+        return byte_hash(img), perceptual_hash(img), thumbnail(img)
+
+    def get(self, keys, prompt_version, language):
+        """Eşleşen kaydın {'detected_items', 'translated_blocks'} sözlüğünü ya da None döndürür."""
+        sha, phash, thumb = keys
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha, payload FROM pages WHERE sha = ? AND prompt_version = ? AND language = ?",
+                (sha, prompt_version, language),
+            ).fetchone()
+            if row is None:
+                row = self._nearest(phash, thumb, prompt_version, language)
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE pages SET last_access = ? WHERE sha = ? AND prompt_version = ? AND language = ?",
+                (time.time(), row[0], prompt_version, language),
+            )
+            self.conn.commit()
+            self.hits += 1
+            return json.loads(row[1])
+
+    def _nearest(self, phash, thumb, prompt_version, language):
+        """Algısal özeti yakın olan ve küçük resmi de tutan en yakın kaydı döndürür."""
+        bands = _bands(phash)
+        where = " OR ".join(f"band{i} = ?" for i in range(BANDS))
+        rows = self.conn.execute(
+            f"SELECT sha, payload, phash, thumb FROM pages WHERE ({where}) AND prompt_version = ? AND language = ?",
+            (*bands, prompt_version, language),
+        ).fetchall()
+        candidates = []
+        for sha, payload, stored, stored_thumb in rows:
+            distance = bin((stored & 0xFFFFFFFFFFFFFFFF) ^ phash).count("1")
+            if distance <= MAX_HAMMING_DISTANCE:
+                candidates.append((distance, sha, payload, stored_thumb))
+        for _, sha, payload, stored_thumb in sorted(candidates, key=lambda candidate: candidate[0]):
+            if thumbnails_match(thumb, stored_thumb):
+                return sha, payload
+        return None
+
+    def put(self, keys, prompt_version, language, detected_items, translated_blocks):
+        sha, phash, thumb = keys
+        payload = json.dumps({'detected_items': detected_items, 'translated_blocks': translated_blocks}, ensure_ascii=False)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (sha, _signed(phash), *_bands(phash), prompt_version, language,
+                 payload, len(payload.encode()) + len(thumb), time.time(), thumb),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Toplam boyut sınırı aşılırsa en uzun süredir kullanılmayan kayıtları siler."""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for rowid, size in self.conn.execute("SELECT rowid, size FROM pages ORDER BY last_access").fetchall():
+            self.conn.execute("DELETE FROM pages WHERE rowid = ?", (rowid,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self.lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': count, 'bytes': total}
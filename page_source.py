@@ -0,0 +1,147 @@
+"""Yüklenen dosyadan sayfaları istendikçe okuyan kaynaklar.
+
+Her arşiv türü için ayrı bir arka uç vardır (PDF, ZIP/CBZ, RAR/CBR, tek
+görsel). Sayfa sayısı dosya açılırken içindekiler listesinden öğrenilir,
+ancak sayfa baytları yalnızca hat o sayfayı istediğinde okunur. Arşivdeki
+JPEG/PNG baytları yeniden kodlanmadan olduğu gibi aktarılır.
+"""
+import os
+import shutil
+import tempfile
+import weakref
+import zipfile
+
+import fitz  # PyMuPDF
+import rarfile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class PdfSource:
+    """PDF sayfaları; tek görselden oluşan sayfalarda gömülü görsel aynen alınır."""
+
+    def __init__(self, file_obj):
+        self.doc = fitz.open(stream=file_obj.read(), filetype="pdf")
+
+    def __len__(self):
+        return self.doc.page_count
+
+    def read(self, index):
+        page = self.doc[index]
+        images = page.get_images(full=True)
+        if len(images) == 1 and not page.get_text().strip():
+            extracted = self.doc.extract_image(images[0][0])
+            if extracted and extracted.get('ext') in ('jpeg', 'jpg', 'png'):
+                return extracted['image'], '.' + extracted['ext']
+        return page.get_pixmap().tobytes("png"), '.png'
+
+    def close(self):
+        self.doc.close()
+
+
+class ArchiveSource:
+    """ZIP/CBZ veya RAR/CBR arşivindeki görsel dosyaları, isim sırasıyla."""
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.names = [name for name in sorted(archive.namelist()) if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def read(self, index):
+        name = self.names[index]
+        return self.archive.read(name), os.path.splitext(name)[1].lower()
+
+    def close(self):
+        self.archive.close()
+
+
+class ImageSource:
+    """Tek görsel dosyası."""
+
+    def __init__(self, file_obj, filename):
+        self.data = file_obj.read()
+        self.ext = os.path.splitext(filename)[1].lower()
+
+    def __len__(self):
+        return 1
+
+    def read(self, index):
+        return self.data, self.ext
+
+    def close(self):
+        self.data = None
+
+
+def open_page_source(file_obj, filename):
+    """Dosya uzantısına göre uygun kaynağı açar; desteklenmeyen dosyada None döndürür."""
+    filename = filename.lower()
+    if filename.endswith('.pdf'):
+        return PdfSource(file_obj)
+    if filename.endswith(('.zip', '.cbz')):
+        return ArchiveSource(zipfile.ZipFile(file_obj))
+    if filename.endswith(('.rar', '.cbr')):
+        # Bazı CBR dosyaları aslında ZIP arşividir
+        try:
+            return ArchiveSource(zipfile.ZipFile(file_obj))
+        except zipfile.BadZipFile:
+            file_obj.seek(0)
+            return ArchiveSource(rarfile.RarFile(file_obj))
+    if filename.endswith(IMAGE_EXTENSIONS):
+        return ImageSource(file_obj, filename)
+    return None
+
+
+def iter_pages(source, indices=None, metrics=None):
+    """Kaynağın sayfalarını (index, bayt, uzantı, hata) olarak sırayla, tembel üretir.
+
+    `indices` verilirse yalnızca o sayfalar okunur (yarım kalan işe devam için).
+    `metrics` verilirse her okuma 'extract' adımı olarak ölçülür.
+    Okunamayan sayfa (ör. arşivde bozuk bir dosya) dosyanın geri kalanını
+    durdurmaz: bayt ve uzantı None, hata ise istisnanın kendisi olarak verilir.
+    """
+    for index in (range(len(source)) if indices is None else indices):
+        try:
+            if metrics is None:
+                data, ext = source.read(index)
+            else:
+                with metrics.span('extract', index):
+                    data, ext = source.read(index)
+        except Exception as e:
+            yield index, None, None, e
+            continue
+        yield index, data, ext, None
+
+
+class PageSpool:
+    """Bir yüklemenin sayfa dosyalarını tek bir klasörde toplar.
+
+    Çevrilmiş çıktılar ve önizlemeler buraya yazılır. Klasör
+    verilmezse geçici bir klasör açılır ve nesne silinirken ya da süreç
+    kapanırken temizlenir; verilen klasör ise `cleanup` çağrılana kadar kalır.
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            self.dir = tempfile.mkdtemp(prefix="manga_")
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, ignore_errors=True)
+        else:
+            self.dir = directory
+            os.makedirs(directory, exist_ok=True)
+            self._finalizer = None
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def write(self, name, data):
+        path = self.path(name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def cleanup(self):
+        if self._finalizer is not None:
+            self._finalizer()
+        else:
+            shutil.rmtree(self.dir, ignore_errors=True)
@@ -0,0 +1,333 @@
+"""Sayfa çeviri hattı.
+
+Çıkarma, tespit, çeviri ve çizim aşamaları sınırlı kuyruklarla birbirine
+bağlanır; her aşama kendi iş parçacıklarıyla eşzamanlı çalışır. API çağrıları
+anahtar başına bir token bucket ile sınırlandırıldığından toplam hız anahtar
+sayısıyla birlikte artar.
+
+Bu modül Streamlit'e bağımlı değildir; model üretici fonksiyon dışarıdan
+verildiği için gecikme ve 429 üreten sahte bir modelle de çalıştırılabilir.
+"""
+import itertools
+import queue
+import threading
+import time
+
+from metrics import Metrics, content_bytes
+
+
+# --- Hız Sınırlayıcı ---
+class TokenBucket:
+    """Saniyede `rate` token dolan, en fazla `capacity` token biriktiren kova."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """Token varsa alır ve 0 döndürür; yoksa beklenmesi gereken süreyi döndürür."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def penalize(self, seconds):
+        """429 sonrası kovayı boşaltır; anahtar en az `seconds` saniye kullanılmaz."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+# --- Anahtar Havuzu ---
+class KeyPool:
+    """API anahtarlarını, anahtar başına modeli ve hız sınırlayıcısını yönetir.
+
+    `model_factory(api_key)` her anahtar için bir kez çağrılır ve
+    `generate_content` metodu olan bir nesne döndürmelidir. Denemeler, 429
+    hataları, anahtar değişimleri ve gönderilen baytlar `metrics`'e sayılır.
+    """
+
+    def __init__(self, api_keys, model_factory, requests_per_minute=10, burst=1, metrics=None):
+        self.keys = list(api_keys)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.model_factory = model_factory
+        self.buckets = [TokenBucket(requests_per_minute / 60.0, burst) for _ in self.keys]
+        self.models = [None] * len(self.keys)
+        self.lock = threading.Lock()
+        self.next_index = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def acquire(self):
+        """Token'ı olan ilk anahtarın index'ini döndürür; hiçbiri yoksa bekler."""
+        while True:
+            with self.lock:
+                start = self.next_index
+                waits = []
+                for offset in range(len(self.keys)):
+                    key_index = (start + offset) % len(self.keys)
+                    wait = self.buckets[key_index].try_acquire()
+                    if wait == 0:
+                        self.next_index = (key_index + 1) % len(self.keys)
+                        return key_index
+                    waits.append(wait)
+            time.sleep(min(waits))
+
+    def model(self, key_index):
+        with self.lock:
+            if self.models[key_index] is None:
+                self.models[key_index] = self.model_factory(self.keys[key_index])
+            return self.models[key_index]
+
+    def call(self, content, log=print, max_retries=None, initial_delay=1):
+        """Gemini API'yi çağırır, 429 hatasında anahtarı dinlendirip sıradakiyle tekrar dener."""
+        return self._request(content, log, max_retries, initial_delay, stream=False)
+
+    def stream(self, content, log=print, max_retries=None, initial_delay=1):
+        """`call` gibi çağırır ama yanıt metnini geldikçe parça parça verir.
+
+        429 hatası yalnızca ilk parça gelmeden önce yeniden denenir. Akış
+        ortasında kesilirse hata loglanır ve o ana kadar gelen parçalarla
+        yetinilir; çağıran taraf eksik yanıtı kendisi tamamlamalıdır.
+        """
+        response = self._request(content, log, max_retries, initial_delay, stream=True)
+        if response is None:
+            return
+        try:
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    yield text
+        except Exception as e:
+            self.metrics.count('stream_errors')
+            log(f"UYARI: API yanıt akışı yarıda kesildi: {e}")
+
+    def _request(self, content, log, max_retries, initial_delay, stream):
+        if not self.keys:
+            log("HATA: Geçerli bir Gemini modeli yok. API çağrısı yapılamıyor.")
+            return None
+        if max_retries is None:
+            max_retries = len(self.keys) + 2
+        delay = initial_delay
+        size = content_bytes(content)
+        rested_key = None
+        for attempt in range(max_retries):
+            key_index = self.acquire()
+            if rested_key is not None and key_index != rested_key:
+                self.metrics.count('key_rotations')
+            try:
+                model = self.model(key_index)
+            except Exception as e:
+                log(f"HATA: API Anahtarı Index {key_index} ile yapılandırma başarısız: {e}")
+                return None
+            self.metrics.count('api_attempts')
+            self.metrics.count('bytes_sent', size)
+            try:
+                if stream:
+                    response = model.generate_content(content, stream=True)
+                    # 429 gibi hatalar çoğunlukla ilk parça okunurken gelir
+                    chunks = iter(response)
+                    first = next(chunks, None)
+                    response = itertools.chain([] if first is None else [first], chunks)
+                else:
+                    response = model.generate_content(content)
+                log(f"API çağrısı başarılı. (Anahtar Index: {key_index})")
+                return response
+            except Exception as e:
+                if '429' in str(e):
+                    self.metrics.count('api_429')
+                    log(f"429 Hatası (Anahtar Index: {key_index}). Anahtar {delay:.1f}sn dinlendiriliyor. Detay: {e}")
+                    self.buckets[key_index].penalize(delay)
+                    rested_key = key_index
+                    delay = min(delay * 1.5, 15)  # Gecikmeyi biraz artır
+                    continue
+                self.metrics.count('api_errors')
+                log(f"API çağrısı sırasında beklenmeyen hata (Anahtar Index: {key_index}): {e}")
+                return None
+        log(f"HATA: API çağrısı {max_retries} denemeden sonra başarısız oldu.")
+        return None
+
+
+# --- Aşamalı Sayfa Hattı ---
+_STOP = object()
+
+
+class Batched:
+    """Aşama fonksiyonunu tek sayfa yerine sayfa grupları üzerinde çalıştırır.
+
+    Grup, `cost(page)` toplamı `budget`'ı aşmayacak ve en fazla `max_items`
+    sayfa olacak şekilde kuyruktan toplanır; `max_wait` saniye içinde yeni
+    sayfa gelmezse eldeki grupla devam edilir. `func(pages, log)` aldığı
+    sayfa sözlüklerini döndürmelidir; jeneratör olarak bittikçe tek tek de
+    verebilir, bu durumda her sayfa grubun geri kalanını beklemeden sonraki
+    aşamaya geçer.
+    """
+
+    def __init__(self, func, cost, budget, max_items=8, max_wait=0.5):
+        self.func = func
+        self.cost = cost
+        self.budget = budget
+        self.max_items = max_items
+        self.max_wait = max_wait
+
+
+class PagePipeline:
+    """Sayfaları sırayla aşamalardan geçirir; her aşama ayrı iş parçacıklarında çalışır.
+
+    `stages` listesi (ad, fonksiyon, işçi_sayısı) üçlülerinden oluşur. Her
+    fonksiyon `fonksiyon(page, log)` şeklinde çağrılır ve sayfa sözlüğünü
+    döndürür; `Batched` ile sarılan fonksiyonlar sayfa listesi alır.
+    `page['status']` 'error' olan sayfa sonraki aşamalara gönderilmez,
+    doğrudan sonuç olarak bildirilir.
+    """
+
+    def __init__(self, stages, queue_size=4, metrics=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        # Sayfa kaynağını okuyan taraf da aynı ölçümlere yazabilsin diye tutulur
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.events = queue.Queue()
+        self.stop_event = threading.Event()
+
+    def log(self, message):
+        """İş parçacıklarından güvenle çağrılabilir; mesaj ana döngüye iletilir."""
+        self.events.put(('log', message))
+
+    def _put(self, q, item):
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, pages, first_queue, worker_count):
+        try:
+            for idx, page in pages:
+                # Okunamayan sayfa aşamalara girmeden hata olarak bildirilir
+                if page.get('status') == 'error':
+                    self.events.put(('page', idx, page))
+                    continue
+                if not self._put(first_queue, (idx, page)):
+                    return
+        except Exception as e:
+            self.log(f"HATA: Sayfa kaynağı okunamadı: {e}")
+        for _ in range(worker_count):
+            self._put(first_queue, _STOP)
+
+    def _gather(self, batch, in_queue, first):
+        """İlk öğeye bütçe dolana kadar yenilerini ekler; (grup, sıradaki_öğe) döndürür."""
+        items = [first]
+        total = batch.cost(first[1])
+        deadline = time.monotonic() + batch.max_wait
+        while len(items) < batch.max_items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = in_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return items, item
+            item_cost = batch.cost(item[1])
+            if total + item_cost > batch.budget:
+                return items, item
+            items.append(item)
+            total += item_cost
+        return items, None
+
+    def _forward(self, idx, page, out_queue):
+        if page.get('status') == 'error' or out_queue is None:
+            self.events.put(('page', idx, page))
+        else:
+            self._put(out_queue, (idx, page))
+
+    def _process(self, name, func, items, out_queue):
+        index_of = {id(page): idx for idx, page in items}
+        forwarded = set()
+        try:
+            if isinstance(func, Batched):
+                results = func.func([page for _, page in items], self.log)
+            else:
+                results = [func(items[0][1], self.log)]
+            for page in results:
+                idx = index_of.get(id(page), items[0][0])
+                forwarded.add(idx)
+                self._forward(idx, page, out_queue)
+        except Exception as e:
+            for idx, page in items:
+                if idx in forwarded:
+                    continue
+                page['status'] = 'error'
+                page['log'] = f'{name} aşamasında hata: {e}'
+                self.log(f"HATA: Sayfa {idx+1}, {name} aşaması: {e}")
+                self._forward(idx, page, out_queue)
+
+    def _work(self, stage_index, in_queue, out_queue, finished):
+        name, func, _ = self.stages[stage_index]
+        pending = None
+        while not self.stop_event.is_set():
+            if pending is not None:
+                item, pending = pending, None
+            else:
+                try:
+                    item = in_queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+            if item is _STOP:
+                break
+            if isinstance(func, Batched):
+                items, pending = self._gather(func, in_queue, item)
+            else:
+                items = [item]
+            self._process(name, func, items, out_queue)
+        with finished['lock']:
+            finished['count'] += 1
+            last = finished['count'] == finished['total']
+        if last:
+            if out_queue is None:
+                self.events.put(('end', None))
+            else:
+                for _ in range(self.stages[stage_index + 1][2]):
+                    self._put(out_queue, _STOP)
+
+    def run(self, pages):
+        """`(idx, page)` çiftlerini işler; ('log', mesaj) ve ('page', idx, page) olayları üretir."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._feed, args=(pages, queues[0], self.stages[0][2]), daemon=True)]
+        for stage_index, (_, _, worker_count) in enumerate(self.stages):
+            out_queue = queues[stage_index + 1] if stage_index + 1 < len(self.stages) else None
+            finished = {'lock': threading.Lock(), 'count': 0, 'total': worker_count}
+            for _ in range(worker_count):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage_index, queues[stage_index], out_queue, finished),
+                    daemon=True,
+                ))
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                event = self.events.get()
+                if event[0] == 'end':
+                    break
+                yield event
+            # Son aşama bittikten sonra kalan log mesajlarını da ilet
+            while not self.events.empty():
+                yield self.events.get_nowait()
+        finally:
+            # Streamlit yeniden çalıştırmasında jeneratör kapanır; işçileri durdur
+            self.stop_event.set()
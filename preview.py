@@ -0,0 +1,39 @@
+"""Okuyucuda gösterilecek hafif sayfa önizlemeleri.
+
+Önizlemeler genişliği sınırlanmış WebP (desteklenmiyorsa JPEG) dosyalarıdır;
+her sayfa için bir kez üretilip tam çözünürlüklü dosyanın yanında saklanır.
+Tam çözünürlüklü görseller yalnızca dışa aktarmada kullanılır.
+"""
+import os
+
+from PIL import Image, features
+
+PREVIEW_MAX_WIDTH = 1000
+PREVIEW_QUALITY = 80
+if features.check('webp'):
+    PREVIEW_FORMAT, PREVIEW_MIME, PREVIEW_EXT = 'WEBP', 'image/webp', '.webp'
+else:
+    PREVIEW_FORMAT, PREVIEW_MIME, PREVIEW_EXT = 'JPEG', 'image/jpeg', '.jpg'
+
+
+def preview_path_for(path):
+    return os.path.splitext(path)[0] + "_onizleme" + PREVIEW_EXT
+
+
+def save_preview(img, path):
+    """Görselin genişliği sınırlanmış önizlemesini `path`'in yanına yazar ve yolunu döndürür."""
+    preview_path = preview_path_for(path)
+    preview = img.convert("RGB")
+    if preview.width > PREVIEW_MAX_WIDTH:
+        preview = preview.resize((PREVIEW_MAX_WIDTH, round(preview.height * PREVIEW_MAX_WIDTH / preview.width)), Image.LANCZOS)
+    preview.save(preview_path, format=PREVIEW_FORMAT, quality=PREVIEW_QUALITY)
+    return preview_path
+
+
+def ensure_preview(path):
+    """Dosyanın önizlemesi yoksa üretir; önizleme yolunu döndürür."""
+    preview_path = preview_path_for(path)
+    if not os.path.exists(preview_path):
+        with Image.open(path) as img:
+            save_preview(img, path)
+    return preview_path
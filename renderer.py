@@ -0,0 +1,58 @@
+"""Çevrilmiş metinlerin sayfa üzerine çizimi.
+
+Her balon için yarı saydam beyaz kutu, sayfanın tamamı yerine yalnızca
+kutunun kapladığı bölgede birleştirilir (alpha_composite) ve yerine
+yapıştırılır. Kutu dışındaki pikseller zaten değişmediği için sonuç, her
+balon için sayfa boyutunda katman oluşturan eski yöntemle piksel piksel
+aynıdır; ancak bellek ve süre sayfa boyutuyla değil kutu alanıyla orantılıdır.
+"""
+import math
+
+from PIL import Image, ImageDraw
+
+from text_layout import LINE_SPACING, get_optimal_font_size
+
+BOX_FILL = (255, 255, 255, 180)
+TEXT_FILL = (0, 0, 0, 255)
+
+
+def box_to_pixels(box, width, height):
+    """0-1000 arası normalize [ymin, xmin, ymax, xmax] kutusunu piksel koordinatına çevirir."""
+    ymin, xmin, ymax, xmax = box
+    return xmin * width / 1000, ymin * height / 1000, xmax * width / 1000, ymax * height / 1000
+
+
+def _composite_box(page_img, left, top, right, bottom):
+    """Yarı saydam kutuyu yalnızca kapladığı bölgede birleştirir."""
+    # Kutu kenarları dahil çizildiği için bölge bir piksel geniş tutulur
+    x0 = max(0, math.floor(min(left, right)) - 1)
+    y0 = max(0, math.floor(min(top, bottom)) - 1)
+    x1 = min(page_img.width, math.ceil(max(left, right)) + 2)
+    y1 = min(page_img.height, math.ceil(max(top, bottom)) + 2)
+    if x0 >= x1 or y0 >= y1:
+        return
+    region = (x0, y0, x1, y1)
+    layer = Image.new("RGBA", (x1 - x0, y1 - y0), (255, 255, 255, 0))
+    ImageDraw.Draw(layer).rectangle([left - x0, top - y0, right - x0, bottom - y0], fill=BOX_FILL)
+    page_img.paste(Image.alpha_composite(page_img.crop(region), layer), region)
+
+
+def render_translations(img, detected_items, translated_blocks, font_path):
+    """Çevirileri sayfaya çizer ve RGB görsel döndürür."""
+    processed_img = img.convert("RGBA")
+    draw = ImageDraw.Draw(processed_img)
+    for i, item in enumerate(detected_items):
+        cleaned_translation = translated_blocks[i] if i < len(translated_blocks) and translated_blocks[i] is not None else "Çeviri hatası"
+        left, top, right, bottom = box_to_pixels(item.get('box'), img.width, img.height)
+        # Kutular ve metinler sırayla çizilir; üst üste binen balonlar eskisi gibi görünür
+        _composite_box(processed_img, left, top, right, bottom)
+        text_box_width = right - left
+        text_box_height = bottom - top
+        font, font_size, wrapped = get_optimal_font_size(cleaned_translation, text_box_width, text_box_height, font_path)
+        bbox = draw.multiline_textbbox((0, 0), wrapped, font=font, spacing=LINE_SPACING)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        text_x = left + (text_box_width - text_width) / 2
+        text_y = top + (text_box_height - text_height) / 2
+        draw.multiline_text((text_x, text_y), wrapped, fill=TEXT_FILL, font=font, spacing=LINE_SPACING, align="center")
+    return processed_img.convert("RGB")
@@ -0,0 +1,31 @@
+import zipfile
+
+import pytest
+
+import cli
+
+
+class BrokenTranslator:
+    def build_pipeline(self, *args, **kwargs):
+        raise RuntimeError("hat kurulamadı")
+
+
+def test_translate_file_closes_source_on_error(tmp_path, monkeypatch):
+    path = tmp_path / "cilt.cbz"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("001.jpg", b"")
+    sources = []
+
+    def open_page_source(file_obj, filename):
+        source = real_open(file_obj, filename)
+        sources.append(source)
+        return source
+
+    real_open = cli.open_page_source
+    monkeypatch.setattr(cli, "open_page_source", open_page_source)
+    monkeypatch.setattr(cli, "create_translator", lambda options: BrokenTranslator())
+    options = {'series': None, 'verbose': False, 'format': 'cbz', 'batch_mode': True, 'render_workers': 1, 'prefilter': False}
+    with pytest.raises(RuntimeError):
+        cli.translate_file(str(path), str(tmp_path / "cilt_tr.cbz"), options)
+    assert len(sources) == 1
+    assert sources[0].archive.fp is None
@@ -0,0 +1,76 @@
+import zipfile
+
+import fitz
+from PIL import Image
+
+from exporter import IncrementalExporter
+
+
+def make_images(tmp_path, count):
+    """Genişliği index'ine göre değişen sayfalar; PDF'teki sıra genişlikten okunur."""
+    paths = []
+    for idx in range(count):
+        path = tmp_path / f"{idx}.jpg"
+        Image.new("RGB", (50 + idx, 70), (idx * 40, 0, 0)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def pdf_widths(path):
+    with fitz.open(path) as doc:
+        assert not doc.is_repaired
+        return [int(page.rect.width) for page in doc]
+
+
+def test_out_of_order_adds_then_resume(tmp_path):
+    images = make_images(tmp_path, 6)
+    pdf_path, cbz_path = str(tmp_path / "out.pdf"), str(tmp_path / "out.cbz")
+    exporter = IncrementalExporter(pdf_path, cbz_path)
+    for idx in (3, 0, 5, 1):
+        exporter.add(idx, images[idx])
+    exporter.close()
+    assert pdf_widths(pdf_path) == [50, 51, 53, 55]
+
+    exporter = IncrementalExporter(pdf_path, cbz_path, [0, 1, 3, 5])
+    assert exporter.exported == [0, 1, 3, 5]
+    for idx in (4, 2):
+        exporter.add(idx, images[idx])
+    exporter.close()
+    assert pdf_widths(pdf_path) == [50, 51, 52, 53, 54, 55]
+    with zipfile.ZipFile(cbz_path) as archive:
+        assert sorted(archive.namelist()) == [f"{idx:04d}.jpg" for idx in range(1, 7)]
+
+
+def test_repaired_file_is_rewritten_on_next_add(tmp_path):
+    images = make_images(tmp_path, 4)
+    pdf_path = str(tmp_path / "out.pdf")
+    # Eski davranış: aynı belgeye art arda saveIncr onarılması gereken bir dosya bırakır
+    doc = fitz.open()
+    doc.new_page(width=50, height=70)
+    doc.save(pdf_path)
+    doc.close()
+    doc = fitz.open(pdf_path)
+    for width in (51, 52):
+        doc.new_page(width=width, height=70)
+        doc.saveIncr()
+    doc.close()
+    with fitz.open(pdf_path) as doc:
+        assert doc.is_repaired
+
+    exporter = IncrementalExporter(pdf_path, None, [0, 1, 2])
+    exporter.add(3, images[3])
+    # Aynı sayfa ikinci kez eklenmez
+    exporter.add(3, images[3])
+    exporter.close()
+    assert pdf_widths(pdf_path) == [50, 51, 52, 53]
+
+
+def test_cbz_only_writes_no_pdf(tmp_path):
+    images = make_images(tmp_path, 3)
+    cbz_path = str(tmp_path / "out.cbz")
+    exporter = IncrementalExporter(None, cbz_path)
+    for idx in (2, 0, 1):
+        exporter.add(idx, images[idx])
+    exporter.close()
+    assert len(exporter) == 3
+    assert not list(tmp_path.glob("*.pdf"))
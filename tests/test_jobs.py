@@ -0,0 +1,72 @@
+import io
+import zipfile
+
+import fitz
+from PIL import Image
+
+from jobs import JobManager
+from pipeline import PagePipeline
+
+
+def make_cbz(count):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for idx in range(count):
+            image = io.BytesIO()
+            Image.new("RGB", (50 + idx, 70), (idx * 30, 0, 0)).save(image, "PNG")
+            archive.writestr(f"{idx:02d}.png", image.getvalue())
+    return buffer.getvalue()
+
+
+def pipeline_factory(broken):
+    """Yükleyip JPEG olarak kaydeden iki aşamalı hat; `broken` içindeki sayfaların çıktısı bozuk yazılır."""
+    def load(page, log):
+        page['img'] = Image.open(io.BytesIO(page.pop('data'))).convert("RGB")
+        return page
+
+    def render(page, log):
+        if page['idx'] in broken:
+            with open(page['out_path'], "wb") as f:
+                f.write(b"bozuk")
+        else:
+            page['img'].save(page['out_path'], "JPEG")
+        page['translated_img_path'] = page['out_path']
+        page['status'] = 'done'
+        return page
+
+    return lambda options: PagePipeline([('Yükleme', load, 1), ('Çizim', render, 1)])
+
+
+def test_failed_export_marks_page_error_and_retry_completes(tmp_path):
+    broken = {2}
+    manager = JobManager(str(tmp_path), pipeline_factory(broken))
+    job = manager.submit(make_cbz(6), "bolum.cbz", {})
+    job.future.result()
+    state, pages = job.snapshot()
+    assert state == 'finished'
+    assert pages[2]['status'] == 'error'
+    assert 'dışa aktarılamadı' in pages[2]['log']
+    assert [pages[idx]['status'] for idx in (0, 1, 3, 4, 5)] == ['done'] * 5
+    assert not any('yarıda kaldı' in message for message in job.logs)
+
+    broken.clear()
+    manager.retry(job)
+    job.future.result()
+    state, pages = job.snapshot()
+    assert all(page['status'] == 'done' for page in pages.values())
+    with fitz.open(job.export_path('pdf')) as doc:
+        assert not doc.is_repaired
+        assert [int(page.rect.width) for page in doc] == [50, 51, 52, 53, 54, 55]
+    with zipfile.ZipFile(job.export_path('cbz')) as archive:
+        assert len(archive.namelist()) == 6
+
+
+def test_same_file_with_new_options_reuses_the_job(tmp_path):
+    manager = JobManager(str(tmp_path), pipeline_factory(set()))
+    data = make_cbz(2)
+    job = manager.submit(data, "bolum.cbz", {'batch_mode': True})
+    again = manager.submit(data, "bolum.cbz", {'batch_mode': False, 'series': 'baska'})
+    assert again is job
+    assert job.options == {'batch_mode': True}
+    job.future.result()
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,76 @@
+import json
+
+from json_stream import JsonArrayStream
+
+ITEMS = [{'text': 'A', 'box': [0, 0, 10, 10]}, {'text': 'B [x]', 'box': [5, 5, 20, 20]}]
+
+
+def feed_all(text, chunk_size=7):
+    parser = JsonArrayStream()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items += parser.feed(text[start:start + chunk_size])
+    return parser, items + parser.close()
+
+
+def test_items_are_returned_as_they_complete():
+    parser = JsonArrayStream()
+    text = json.dumps(ITEMS)
+    first_end = text.index('}') + 1
+    assert parser.feed(text[:first_end]) == [ITEMS[0]]
+    assert parser.feed(text[first_end:]) == [ITEMS[1]]
+    assert parser.complete
+
+
+def test_code_fence_and_trailing_commas():
+    parser, items = feed_all('```json\n[{"text": "A", "box": [0, 0, 10, 10],},]\n```')
+    assert items == [ITEMS[0]]
+    assert parser.complete
+
+
+def test_prose_brackets_before_the_list_are_ignored():
+    parser, items = feed_all('Here [is] the result: ' + json.dumps(ITEMS))
+    assert items == ITEMS
+    assert parser.complete
+
+
+def test_prose_brackets_alone_are_not_an_empty_list():
+    parser, items = feed_all('Here [is] nothing useful.')
+    assert items == []
+    assert not parser.started
+    assert not parser.complete
+
+
+def test_empty_list_is_complete():
+    parser, items = feed_all('[]')
+    assert items == []
+    assert parser.complete
+
+
+def test_truncated_response_recovers_last_item_but_is_incomplete():
+    text = json.dumps(ITEMS)
+    parser, items = feed_all(text[:text.index('"box"', text.index('B'))])
+    assert items == [ITEMS[0], {'text': 'B [x]'}]
+    assert parser.recovered == 1
+    assert not parser.complete
+
+
+def test_unclosed_list_is_incomplete():
+    text = json.dumps(ITEMS)
+    parser, items = feed_all(text[:-1])
+    assert items == ITEMS
+    assert not parser.complete
+
+
+def test_broken_item_is_skipped_without_losing_the_others():
+    text = json.dumps(ITEMS).replace('"A"', 'A?', 1)
+    parser, items = feed_all(text)
+    assert items == [ITEMS[1]]
+    assert parser.skipped == 1
+    assert not parser.complete
+
+
+def test_stray_value_between_items_is_malformed():
+    parser, items = feed_all('[{"a": 1}, 5, {"b": 2}]')
+    assert items == [{'a': 1}, {'b': 2}]
+    assert not parser.complete
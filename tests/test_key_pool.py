@@ -0,0 +1,38 @@
+from fake_model import FakeModelFactory
+from pipeline import KeyPool
+
+
+def make_pool(keys=('k1', 'k2'), **options):
+    factory = FakeModelFactory(responder=lambda content: "0123456789" * 10, chunk_size=10, **options)
+    return KeyPool(list(keys), factory, requests_per_minute=60000), factory
+
+
+def test_stream_retries_429_before_first_chunk():
+    pool, factory = make_pool(keys=('k1',), rate_limits=1)
+    logs = []
+    text = ''.join(pool.stream("istek", log=logs.append, initial_delay=0.01))
+    assert text == "0123456789" * 10
+    counters = pool.metrics.counter_values()
+    assert counters['api_429'] == 1
+    assert counters['api_attempts'] == 2
+    assert factory.calls == 2
+
+
+def test_stream_keeps_chunks_received_before_a_mid_stream_failure():
+    pool, factory = make_pool(break_after=35)
+    logs = []
+    text = ''.join(pool.stream("istek", log=logs.append))
+    assert text == ("0123456789" * 10)[:35]
+    counters = pool.metrics.counter_values()
+    assert counters['stream_errors'] == 1
+    # Parça geldikten sonraki hata yeniden denenmez
+    assert counters['api_attempts'] == 1
+    assert any('yarıda kesildi' in message for message in logs)
+
+
+def test_stream_gives_up_after_max_retries():
+    pool, factory = make_pool(keys=('k1',), rate_limits=10)
+    logs = []
+    assert list(pool.stream("istek", log=logs.append, max_retries=2, initial_delay=0.01)) == []
+    assert pool.metrics.counter_values()['api_429'] == 2
+    assert any('2 denemeden sonra' in message for message in logs)
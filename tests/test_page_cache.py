@@ -0,0 +1,79 @@
+import io
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bench_pipeline import make_manga_page
+from page_cache import MAX_HAMMING_DISTANCE, TranslationCache
+from translator import FONT_PATH
+
+PROMPT_VERSION = "test"
+LANGUAGE = "Türkçe"
+
+
+def make_cache(tmp_path, **options):
+    return TranslationCache(str(tmp_path / "cache.sqlite"), **options)
+
+
+def page_with_text(text, seed=0):
+    img = make_manga_page(random.Random(seed))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse([300, 600, 800, 900], fill="white", outline="black", width=3)
+    draw.text((380, 700), text, fill="black", font=ImageFont.truetype(FONT_PATH, 60))
+    return img
+
+
+def reencode(img, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue())).convert("RGB")
+
+
+def put(cache, img, translation):
+    cache.put(cache.keys_for(img), PROMPT_VERSION, LANGUAGE, [{'text': "", 'box': [0, 0, 10, 10]}], [translation])
+
+
+def get(cache, img):
+    result = cache.get(cache.keys_for(img), PROMPT_VERSION, LANGUAGE)
+    return None if result is None else result['translated_blocks'][0]
+
+
+def test_byte_hash_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    img = page_with_text("HELLO")
+    put(cache, img, "MERHABA")
+    assert get(cache, img.copy()) == "MERHABA"
+    assert cache.stats()['hits'] == 1
+
+
+def test_near_duplicate_hit_after_jpeg_reencode(tmp_path):
+    cache = make_cache(tmp_path)
+    img = reencode(page_with_text("HELLO"), 95)
+    put(cache, img, "MERHABA")
+    copy = reencode(img, 70)
+    assert cache.keys_for(copy)[0] != cache.keys_for(img)[0]
+    assert get(cache, copy) == "MERHABA"
+
+
+def test_rejects_near_match_when_only_text_differs(tmp_path):
+    cache = make_cache(tmp_path)
+    first, second = page_with_text("HELLO"), page_with_text("HELLP")
+    # Algısal özet eşleşir; kaydı reddeden küçük resim doğrulamasıdır
+    assert bin(cache.keys_for(first)[1] ^ cache.keys_for(second)[1]).count("1") <= MAX_HAMMING_DISTANCE
+    put(cache, first, "MERHABA")
+    assert get(cache, second) is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path)
+    # Düz renkli sayfaların kayıtları aynı boyuttadır; renk farkı küçük resim eşiğini aşar
+    pages = [Image.new("RGB", (400, 600), (gray,) * 3) for gray in (0, 60, 120, 180)]
+    for number, img in enumerate(pages[:3]):
+        put(cache, img, f"ÇEVİRİ {number}")
+    cache.max_bytes = cache.stats()['bytes']
+    assert get(cache, pages[0]) == "ÇEVİRİ 0"
+    put(cache, pages[3], "ÇEVİRİ 3")
+    assert cache.stats()['entries'] == 3
+    assert get(cache, pages[1]) is None
+    assert [get(cache, pages[number]) for number in (0, 2, 3)] == ["ÇEVİRİ 0", "ÇEVİRİ 2", "ÇEVİRİ 3"]
@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from bench_pipeline import make_bubbles, make_manga_page, render_translations_full_overlay
+from renderer import render_translations
+from translator import FONT_PATH
+
+
+def assert_same_pixels(img, items, translations):
+    expected = render_translations_full_overlay(img, items, translations, FONT_PATH)
+    actual = render_translations(img, items, translations, FONT_PATH)
+    assert actual.size == expected.size
+    assert np.array_equal(np.asarray(actual), np.asarray(expected))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_matches_full_page_overlay(seed):
+    rng = random.Random(seed)
+    img = make_manga_page(rng, (333 + seed * 97, 517))
+    items, translations = make_bubbles(rng, rng.randint(1, 25))
+    assert_same_pixels(img, items, translations)
+
+
+def test_matches_full_page_overlay_at_edges_and_missing_translations():
+    # 400x500 sayfada 10'un katı kutular tam piksel sınırlarına düşer
+    img = make_manga_page(random.Random(0), (400, 500))
+    items = [
+        {'box': [500, 500, 700, 800]},
+        {'box': [0, 0, 1000, 1000]},
+        {'box': [0, 0, 3, 3]},
+        {'box': [990.5, 990.5, 1000, 1000]},
+        {'box': [400, 400, 400, 600]},
+        {'box': [100.25, 200.75, 300.5, 700.125]},
+        {'box': [120, 220, 320, 720]},
+    ]
+    translations = ["TAM PİKSEL", "TÜM SAYFA", "A", None, "DÜZ", "ÜST ÜSTE BİNEN BALON"]
+    assert_same_pixels(img, items, translations)
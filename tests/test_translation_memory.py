@@ -0,0 +1,61 @@
+import pytest
+
+from translation_memory import TranslationMemory, series_from_filename
+
+
+def make_memory(tmp_path):
+    return TranslationMemory(str(tmp_path / "memory.sqlite"))
+
+
+def test_exact_hit_after_normalization(tmp_path):
+    memory = make_memory(tmp_path)
+    memory.add("seri", [("Wait  for me…", "Bekle beni...")])
+    assert memory.lookup("seri", ["WAIT FOR ME...", "  wait\nfor me... ", "Wait for you"]) == ["Bekle beni...", "Bekle beni...", None]
+    stats = memory.stats("seri")
+    assert (stats['lookups'], stats['exact_hits']) == (3, 2)
+    assert stats['tokens_saved'] > 0
+
+
+def test_fuzzy_references_in_prompt_context(tmp_path):
+    memory = make_memory(tmp_path)
+    memory.add("seri", [("I will never give up!", "Asla vazgeçmeyeceğim!"), ("Where is the station?", "İstasyon nerede?")])
+    memory.add_terms("seri", [{'source': "Luffy", 'translation': "Luffy"}])
+    assert memory.lookup("seri", ["I will never give up!!"]) == [None]
+    assert memory.similar("seri", ["I will never give up!!"]) == [("I will never give up!", "Asla vazgeçmeyeceğim!")]
+    context = memory.prompt_context("seri", ["I will never give up!!"])
+    assert "Luffy → Luffy" in context
+    assert "I will never give up! → Asla vazgeçmeyeceğim!" in context
+    assert "İstasyon" not in context
+    assert memory.stats("seri")['fuzzy_hits'] == 2
+
+
+def test_series_are_isolated(tmp_path):
+    memory = make_memory(tmp_path)
+    memory.add("birinci", [("Run!", "Kaç!")])
+    memory.add_terms("birinci", [{'source': "Goku", 'translation': "Goku"}])
+    assert memory.lookup("ikinci", ["Run!"]) == [None]
+    assert memory.similar("ikinci", ["Run!!"]) == []
+    assert memory.prompt_context("ikinci", ["Run!!"]) == ""
+    assert memory.stats("ikinci")['entries'] == 0
+    assert memory.lookup("birinci", ["run!"]) == ["Kaç!"]
+
+
+def test_existing_translation_is_kept(tmp_path):
+    memory = make_memory(tmp_path)
+    memory.add("seri", [("Run!", "Kaç!")])
+    memory.add("seri", [("RUN!", "Koş!")])
+    assert memory.lookup("seri", ["Run!"]) == ["Kaç!"]
+
+
+@pytest.mark.parametrize("filename, series", [
+    ("One Piece - Chapter 1001.cbz", "one piece"),
+    ("[Grup] Berserk_Vol.03.zip", "berserk"),
+    ("Naruto #12.pdf", "naruto"),
+    ("image.png", None),
+    ("scan.pdf", None),
+    ("001.cbz", None),
+    ("Chapter 5.cbz", None),
+    ("[Grup] 042.cbz", None),
+])
+def test_series_from_filename(filename, series):
+    assert series_from_filename(filename) == series
@@ -0,0 +1,152 @@
+import io
+import json
+import random
+import time
+
+import pytest
+from PIL import Image
+
+from fake_model import FakeModelFactory, default_response
+from page_cache import TranslationCache
+from pipeline import KeyPool
+from translator import PROMPT_VERSION, TARGET_LANGUAGE, Translator
+
+
+def is_batch(content):
+    return not isinstance(content, str) and sum(isinstance(part, dict) for part in content) > 1
+
+
+def make_translator(tmp_path, **options):
+    factory = FakeModelFactory(**options)
+    pool = KeyPool(['k1', 'k2'], factory, requests_per_minute=60000)
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"))
+    return Translator(pool, cache, make_previews=False), factory
+
+
+def load(translator, idx, tmp_path):
+    """Her sayfa farklı gürültüden oluşur; böylece önbellekte birbirine benzemez."""
+    rng = random.Random(idx)
+    img = Image.frombytes('L', (200, 300), bytes(rng.getrandbits(8) for _ in range(200 * 300))).convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    page = {'idx': idx, 'status': 'pending', 'log': '', 'data': buffer.getvalue(), 'out_path': str(tmp_path / f"{idx}.jpg")}
+    return translator.load_page(page, lambda message: None, prefilter=False)
+
+
+def cached(translator, page):
+    return translator.cache.get(page['cache_keys'], PROMPT_VERSION, TARGET_LANGUAGE)
+
+
+def test_single_page_is_translated_and_cached(tmp_path):
+    translator, factory = make_translator(tmp_path)
+    page = translator.detect_and_translate_page(load(translator, 0, tmp_path), lambda message: None)
+    assert page.get('status') != 'error'
+    assert page['translated_blocks'] == ['ÇEVİRİ 1', 'ÇEVİRİ 2']
+    assert len(page['detected_items']) == 2
+    assert cached(translator, page) is not None
+    assert factory.calls == 2
+
+
+def test_single_page_cut_mid_stream_is_rendered_but_not_cached(tmp_path):
+    response = default_response([{}])
+    translator, factory = make_translator(tmp_path, break_after=response.index('}') + 5)
+    page = translator.detect_and_translate_page(load(translator, 0, tmp_path), lambda message: None)
+    assert page.get('status') != 'error'
+    assert page['partial']
+    assert len(page['detected_items']) == 1
+    assert cached(translator, page) is None
+    assert translator.metrics.counter_values()['stream_errors'] == 1
+
+
+def test_single_page_without_any_complete_block_is_an_error(tmp_path):
+    translator, _ = make_translator(tmp_path, break_after=5)
+    page = translator.detect_and_translate_page(load(translator, 0, tmp_path), lambda message: None)
+    assert page['status'] == 'error'
+    assert cached(translator, page) is None
+
+
+@pytest.mark.parametrize('text', ['', 'Here [is] no list.'])
+def test_single_page_without_a_list_is_an_error(tmp_path, text):
+    translator, _ = make_translator(tmp_path, responder=lambda content: text)
+    page = translator.detect_page(load(translator, 0, tmp_path), lambda message: None)
+    assert page['status'] == 'error'
+
+
+def test_batch_falls_back_to_single_requests_for_missing_pages(tmp_path):
+    def responder(content):
+        if not is_batch(content):
+            return default_response(content)
+        entries = json.loads(default_response(content).strip('`json\n'))
+        return json.dumps([entry for entry in entries if entry['page'] != 2])
+
+    translator, factory = make_translator(tmp_path, responder=responder)
+    pages = [load(translator, idx, tmp_path) for idx in range(3)]
+    results = list(translator.detect_and_translate_batch(pages, lambda message: None))
+    assert sorted(page['idx'] for page in results) == [0, 1, 2]
+    assert all(page['translated_blocks'] == ['ÇEVİRİ 1', 'ÇEVİRİ 2'] for page in results)
+    assert all(cached(translator, page) is not None for page in results)
+    # Bir toplu istek, eksik sayfa için bir tespit ve bir çeviri isteği
+    assert factory.calls == 3
+
+
+def test_batch_page_cut_off_at_the_end_is_retried_not_cached_partially(tmp_path):
+    def responder(content):
+        text = default_response(content)
+        return text[:text.rindex('"translation"')] if is_batch(content) else text
+
+    translator, factory = make_translator(tmp_path, responder=responder)
+    pages = [load(translator, idx, tmp_path) for idx in range(3)]
+    results = {page['idx']: page for page in translator.detect_and_translate_batch(pages, lambda message: None)}
+    assert sorted(results) == [0, 1, 2]
+    assert len(results[2]['detected_items']) == 2
+    assert cached(translator, results[2])['translated_blocks'] == ['ÇEVİRİ 1', 'ÇEVİRİ 2']
+    assert factory.calls == 3
+
+
+def test_batch_call_time_excludes_downstream_work(tmp_path):
+    translator, _ = make_translator(tmp_path, latency=0.05)
+    pages = [load(translator, idx, tmp_path) for idx in range(2)]
+    for _ in translator.detect_and_translate_batch(pages, lambda message: None):
+        # Sonraki aşamanın işi; batch_call süresine eklenmemeli
+        time.sleep(0.3)
+    (row,) = [row for row in translator.metrics.summary() if row['stage'] == 'batch_call']
+    assert row['count'] == 1
+    assert 0.05 <= row['total_s'] < 0.3
+
+
+BAD_BOXES = [[None, 1, 2, 3], ["100", 100, 300, 600], [100, 100, float('nan'), 600], [True, 100, 300, 600]]
+
+
+@pytest.mark.parametrize('bad_box', BAD_BOXES)
+def test_single_page_drops_block_with_bad_coordinates(tmp_path, bad_box):
+    def responder(content):
+        if isinstance(content, str):
+            return default_response(content)
+        blocks = json.loads(default_response(content))
+        blocks[0]['box'] = bad_box
+        return json.dumps(blocks)
+
+    translator, _ = make_translator(tmp_path, responder=responder)
+    page = translator.detect_and_translate_page(load(translator, 0, tmp_path), lambda message: None)
+    assert page.get('status') != 'error'
+    assert page['partial']
+    assert [item['text'] for item in page['detected_items']] == ['METİN 2']
+    assert cached(translator, page) is None
+    assert translator.render_page(page, lambda message: None)['status'] == 'done'
+
+
+def test_batch_page_with_bad_coordinates_falls_back_alone(tmp_path):
+    def responder(content):
+        if not is_batch(content):
+            return default_response(content)
+        entries = json.loads(default_response(content).strip('`json\n'))
+        entries[1]['blocks'][0]['box'] = [None, 1, 2, 3]
+        return json.dumps(entries)
+
+    translator, factory = make_translator(tmp_path, responder=responder)
+    pages = [load(translator, idx, tmp_path) for idx in range(3)]
+    results = list(translator.detect_and_translate_batch(pages, lambda message: None))
+    assert all(page.get('status') != 'error' for page in results)
+    assert all(translator.render_page(page, lambda message: None)['status'] == 'done' for page in results)
+    # Bir toplu istek, yalnızca bozuk sayfa için bir tespit ve bir çeviri isteği
+    assert factory.calls == 3
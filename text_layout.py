@@ -0,0 +1,81 @@
+"""Konuşma balonu metin yerleşimi.
+
+Fontlar (yol, boyut) başına bir kez yüklenir, kutuya sığan en büyük boyut
+ikili aramayla bulunur ve satırlar glif genişlikleri ölçülerek kırılır.
+Aynı metin ve kutu boyutu için sonuç önbellekten döner.
+"""
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+LINE_SPACING = 4
+
+# Ölçüm için tek piksellik karalama yüzeyi; yalnızca okunur, paylaşılabilir
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+
+@lru_cache(maxsize=512)
+def load_font(font_path, font_size):
+    """Fontu diskten bir kez yükler; bulunamazsa varsayılan fonta düşer."""
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except IOError:
+        try:
+            return ImageFont.load_default(size=font_size)
+        except Exception:
+            return ImageFont.load_default()
+
+
+def wrap_text(text, font, max_width):
+    """Kelimeleri ölçülen genişliğe göre satırlara böler; sığmayan kelimeyi harflerden keser."""
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if font.getlength(candidate) <= max_width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        line = ""
+        # Tek başına satıra sığmayan kelime
+        while font.getlength(word) > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and font.getlength(word[:cut]) > max_width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line:
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def measure_text(wrapped, font):
+    """Çok satırlı metnin (genişlik, yükseklik) değerini döndürür."""
+    bbox = _MEASURE_DRAW.multiline_textbbox((0, 0), wrapped, font=font, spacing=LINE_SPACING)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+
+@lru_cache(maxsize=4096)
+def get_optimal_font_size(text, box_width, box_height, font_path="manga_font.ttf", max_font_size=100, min_font_size=8, padding=0):
+    """Verilen kutuya metni sığdıracak en büyük font boyutunu ve wrap edilmiş halini döndürür."""
+    inner_width = box_width - 2 * padding
+    inner_height = box_height - 2 * padding
+    best = None
+    low, high = min_font_size, max_font_size
+    while low <= high:
+        font_size = (low + high) // 2
+        font = load_font(font_path, font_size)
+        wrapped = wrap_text(text, font, inner_width)
+        text_width, text_height = measure_text(wrapped, font)
+        if text_width <= inner_width and text_height <= inner_height:
+            best = (font, font_size, wrapped)
+            low = font_size + 1
+        else:
+            high = font_size - 1
+    if best is None:
+        # Kutu çok küçük: minimum boyutta yaz
+        font = load_font(font_path, min_font_size)
+        best = (font, min_font_size, wrap_text(text, font, inner_width))
+    return best
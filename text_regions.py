@@ -0,0 +1,349 @@
+"""API'ye gönderilmeden önce sayfada metin olabilecek bölgeleri bulan yerel ön filtre.
+
+Yalnızca CPU'da, NumPy ve Pillow ile çalışır. Beyaz zemin (balon ya da
+kağıt) üzerindeki seyrek koyu çizgiler metin adayı sayılır; adaylar
+genişletilip bağlı bileşenlere ayrılır ve boyut, yoğunluk ve zemin
+parlaklığına göre elenir. Aynı test görselin negatifinde de yapılır; böylece
+koyu zemin üzerindeki açık renkli metinler (ör. siyah anlatım kutuları) da
+aday olur.
+
+- Hiç aday bölgesi olmayan sayfalar (boş sayfa, tam sayfa çizim, kapak)
+  API'ye hiç gönderilmez.
+- Aday bölgeler sayfanın küçük bir kısmını kaplıyorsa yalnızca bu bölgeler
+  gri boşluklarla ayrılmış tek bir kolaja dizilip gönderilir; yanıttaki
+  kutular `to_page_box` ile sayfa koordinatlarına geri çevrilir.
+- Bölgeler sayfanın büyük kısmını kaplıyorsa sayfa eskisi gibi tam gönderilir.
+- Aday bulunmayan ama büyük kısmı koyu olan sayfalar atlanmaz, tam
+  gönderilir; ön filtrenin kaçırdığı metin kaybolmasın diye.
+
+Etiketli örnek sayfalarla isabet ölçmek için:
+    python text_regions.py ornekler/etiketler.json
+"""
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+# Analiz, uzun kenarı bu boyuta küçültülmüş gri görsel üzerinde yapılır
+ANALYSIS_SIZE = 500
+INK_THRESHOLD = 110
+PAPER_THRESHOLD = 200
+# Metin çizgisi çevresindeki pencerenin (piksel yarıçapı) en az bu kadarı açık zemin olmalı
+CONTEXT_RADIUS = 4
+MIN_PAPER_RATIO = 0.45
+MAX_INK_RATIO = 0.55
+# Harfleri satırlara, satırları bloklara birleştiren genişletme yarıçapı (dikey, yatay)
+MERGE_RADIUS = (3, 5)
+MIN_COMPONENT_INK = 12
+MIN_COMPONENT_SIZE = 5
+MAX_COMPONENT_AREA = 0.25
+REGION_PADDING = 0.015
+
+# Kolaj düzeni
+PACK_GAP = 12
+PACK_GAP_COLOR = (128, 128, 128)
+# Kolaj sayfanın bu oranından büyükse kırpmak kazandırmaz; sayfa tam gönderilir
+PACK_MAX_AREA = 0.6
+# Aday bulunmasa da piksellerinin bu oranı koyu olan sayfa atlanmaz, tam gönderilir
+DARK_PAGE_RATIO = 0.3
+
+
+def _window_sum(mask, ry, rx):
+    """Her pikselin (2ry+1)x(2rx+1) penceresindeki değerlerin toplamı (integral görüntü ile)."""
+    padded = np.pad(mask.astype(np.int32), ((ry, ry), (rx, rx)))
+    integral = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    ky, kx = 2 * ry + 1, 2 * rx + 1
+    return integral[ky:, kx:] - integral[:-ky, kx:] - integral[ky:, :-kx] + integral[:-ky, :-kx]
+
+
+def _box_sums(integral, boxes):
+    """Her (y0, x0, y1, x1) kutusunun içindeki toplam; `integral` başında sıfır satır/sütun olan integral görüntüdür."""
+    return [int(integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]) for y0, x0, y1, x1 in boxes]
+
+
+def _components(mask):
+    """Maskedeki bağlı bileşenlerin (y0, x0, y1, x1) sınır kutuları (bitişler hariç).
+
+    Satır satır koşular (run) çıkarılır ve üst satırdaki çakışan koşularla
+    birleştirilir; piksel başına Python döngüsü yoktur.
+    """
+    parent = []
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    runs = []
+    previous = []
+    for y, row in enumerate(mask):
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+        current = []
+        j = 0
+        for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            run_id = len(runs)
+            runs.append((y, start, end))
+            parent.append(run_id)
+            # 8-komşuluk: üst satırda [start-1, end+1) ile çakışan koşular
+            while j < len(previous) and runs[previous[j]][2] < start:
+                j += 1
+            k = j
+            while k < len(previous) and runs[previous[k]][1] <= end:
+                a, b = find(previous[k]), find(run_id)
+                if a != b:
+                    parent[b] = a
+                k += 1
+            current.append(run_id)
+        previous = current
+
+    boxes = {}
+    for run_id, (y, start, end) in enumerate(runs):
+        root = find(run_id)
+        box = boxes.get(root)
+        if box is None:
+            boxes[root] = [y, start, y + 1, end]
+        else:
+            box[0], box[1] = min(box[0], y), min(box[1], start)
+            box[2], box[3] = max(box[2], y + 1), max(box[3], end)
+    return [tuple(box) for box in boxes.values()]
+
+
+def _merge_overlapping(boxes):
+    """Çakışan kutuları, hiçbiri çakışmayana kadar birleştirir."""
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in sorted(boxes):
+            for other in result:
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                    other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return [tuple(box) for box in boxes]
+
+
+def _analysis_gray(img):
+    """Analiz boyutuna küçültülmüş gri görsel ve ölçek."""
+    scale = min(1.0, ANALYSIS_SIZE / max(img.size))
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return np.asarray(img.convert("L").resize(size, Image.BILINEAR), dtype=np.int16), scale
+
+
+def _regions_in(gray):
+    """Açık zemin üzerindeki koyu metin bölgeleri, analiz koordinatında (y0, x0, y1, x1) ve kenar payıyla."""
+    height, width = gray.shape
+    ink = gray < INK_THRESHOLD
+    paper = gray > PAPER_THRESHOLD
+    window = (2 * CONTEXT_RADIUS + 1) ** 2
+    paper_ratio = _window_sum(paper, CONTEXT_RADIUS, CONTEXT_RADIUS) / window
+    ink_ratio = _window_sum(ink, CONTEXT_RADIUS, CONTEXT_RADIUS) / window
+    candidates = ink & (paper_ratio >= MIN_PAPER_RATIO) & (ink_ratio <= MAX_INK_RATIO)
+    if not candidates.any():
+        return []
+
+    grown = _window_sum(candidates, *MERGE_RADIUS) > 0
+    boxes = _components(grown)
+    ink_integral = np.pad(candidates.astype(np.int32).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    paper_integral = np.pad(paper.astype(np.int32).cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    ink_counts = _box_sums(ink_integral, boxes)
+    paper_counts = _box_sums(paper_integral, boxes)
+
+    pad_y, pad_x = math.ceil(height * REGION_PADDING), math.ceil(width * REGION_PADDING)
+    regions = []
+    for (y0, x0, y1, x1), ink_count, paper_count in zip(boxes, ink_counts, paper_counts):
+        area = (y1 - y0) * (x1 - x0)
+        if ink_count < MIN_COMPONENT_INK or min(y1 - y0, x1 - x0) < MIN_COMPONENT_SIZE:
+            continue
+        if area > MAX_COMPONENT_AREA * width * height or paper_count < MIN_PAPER_RATIO * area:
+            continue
+        regions.append((max(0, y0 - pad_y), max(0, x0 - pad_x), min(height, y1 + pad_y), min(width, x1 + pad_x)))
+    return regions
+
+
+def find_text_regions(img):
+    """Görselde metin olabilecek bölgeleri görselin piksel koordinatında (x0, y0, x1, y1) döndürür.
+
+    Koyu zemin üzerindeki açık metinleri de bulmak için aynı test negatif görselde tekrarlanır.
+    """
+    gray, scale = _analysis_gray(img)
+    regions = _regions_in(gray) + _regions_in(255 - gray)
+    return [
+        (math.floor(x0 / scale), math.floor(y0 / scale), min(img.width, math.ceil(x1 / scale)), min(img.height, math.ceil(y1 / scale)))
+        for y0, x0, y1, x1 in _merge_overlapping(regions)
+    ]
+
+
+def is_dark_page(img):
+    """Piksellerinin en az `DARK_PAGE_RATIO` oranı koyuysa True."""
+    gray, _ = _analysis_gray(img)
+    return (gray < INK_THRESHOLD).mean() >= DARK_PAGE_RATIO
+
+
+def pack_regions(img, regions):
+    """Bölgeleri raf düzeniyle tek bir kolaja dizer.
+
+    (kolaj, yerleşimler) döndürür; her yerleşim (bölge, kolajdaki sol üst köşe)
+    çiftidir. Kolaj sayfanın `PACK_MAX_AREA` oranından büyükse (None, None) döner.
+    """
+    sizes = [(x1 - x0, y1 - y0) for x0, y0, x1, y1 in regions]
+    total_area = sum((w + PACK_GAP) * (h + PACK_GAP) for w, h in sizes)
+    shelf_width = max(max(w for w, _ in sizes), min(img.width, math.ceil(math.sqrt(total_area) * 1.2)))
+
+    placements = []
+    x = y = shelf_height = 0
+    for region, (w, h) in sorted(zip(regions, sizes), key=lambda item: item[1][1], reverse=True):
+        if x and x + w > shelf_width:
+            x, y, shelf_height = 0, y + shelf_height + PACK_GAP, 0
+        placements.append((region, (x, y)))
+        x += w + PACK_GAP
+        shelf_height = max(shelf_height, h)
+    atlas_size = (max(ox + region[2] - region[0] for region, (ox, _) in placements), y + shelf_height)
+    if atlas_size[0] * atlas_size[1] > PACK_MAX_AREA * img.width * img.height:
+        return None, None
+
+    atlas = Image.new("RGB", atlas_size, PACK_GAP_COLOR)
+    for region, offset in placements:
+        atlas.paste(img.crop(region), offset)
+    return atlas, placements
+
+
+def prepare_api_image(img):
+    """API'ye gönderilecek görseli hazırlar: (görsel, yerleşimler).
+
+    Metin adayı yoksa (None, []) döner ve sayfa API'ye gönderilmez; ancak
+    sayfanın büyük kısmı koyuysa ön filtreye güvenilmez ve sayfa tam
+    gönderilir. Kırpma kazandırmıyorsa da (img, None) döner.
+    """
+    regions = find_text_regions(img)
+    if not regions:
+        if is_dark_page(img):
+            return img, None
+        return None, []
+    atlas, placements = pack_regions(img, regions)
+    if atlas is None:
+        return img, None
+    return atlas, placements
+
+
+def to_page_box(box, atlas_size, placements, page_size):
+    """Kolaja göre 0-1000 normalize [ymin, xmin, ymax, xmax] kutusunu sayfaya göre normalize kutuya çevirir.
+
+    Kutu, en çok örtüştüğü bölgeye kırpılır; hiçbir bölgeyle örtüşmüyorsa None döner.
+    """
+    atlas_width, atlas_height = atlas_size
+    ymin, xmin, ymax, xmax = box
+    top, left = min(ymin, ymax) * atlas_height / 1000, min(xmin, xmax) * atlas_width / 1000
+    bottom, right = max(ymin, ymax) * atlas_height / 1000, max(xmin, xmax) * atlas_width / 1000
+
+    best, best_overlap = None, 0
+    for region, (ox, oy) in placements:
+        x0, y0 = max(left, ox), max(top, oy)
+        x1, y1 = min(right, ox + region[2] - region[0]), min(bottom, oy + region[3] - region[1])
+        overlap = max(0, x1 - x0) * max(0, y1 - y0)
+        if overlap > best_overlap:
+            best, best_overlap = (region, ox, oy, x0, y0, x1, y1), overlap
+    if best is None:
+        return None
+    region, ox, oy, x0, y0, x1, y1 = best
+    page_width, page_height = page_size
+    return [
+        round((y0 - oy + region[1]) * 1000 / page_height),
+        round((x0 - ox + region[0]) * 1000 / page_width),
+        round((y1 - oy + region[1]) * 1000 / page_height),
+        round((x1 - ox + region[0]) * 1000 / page_width),
+    ]
+
+
+# --- Etiketli örneklerle değerlendirme ---
+def evaluate(samples, encode):
+    """Ön filtrenin isabetini ve API'ye gönderilen bayt azalmasını ölçer.
+
+    `samples`, (görsel, etiket kutuları) çiftleridir; kutular Gemini ile aynı
+    biçimdedir (0-1000 normalize [ymin, xmin, ymax, xmax]). `encode` bir
+    görseli API'ye gönderilecek baytlara çevirir.
+    """
+    pages = {'tp': 0, 'fp': 0, 'fn': 0, 'tn': 0}
+    labelled_boxes = covered_boxes = region_count = useful_regions = 0
+    full_bytes = sent_bytes = 0
+    for img, labels in samples:
+        regions = find_text_regions(img)
+        has_text, found = bool(labels), bool(regions)
+        pages[('t' if has_text == found else 'f') + ('p' if found else 'n')] += 1
+
+        label_rects = [box_to_rect(box, img.size) for box in labels]
+        for rect in label_rects:
+            labelled_boxes += 1
+            # Birleştirilmiş bölgeler çakışmadığından kesişimler toplanabilir
+            if sum(_intersection(rect, region) for region in regions) >= 0.5 * _area(rect):
+                covered_boxes += 1
+        for region in regions:
+            region_count += 1
+            useful_regions += any(_intersection(region, rect) > 0 for rect in label_rects)
+
+        full_bytes += len(encode(img))
+        api_img, _ = prepare_api_image(img)
+        sent_bytes += len(encode(api_img)) if api_img is not None else 0
+
+    return {
+        'pages': len(samples),
+        'page_precision': _ratio(pages['tp'], pages['tp'] + pages['fp']),
+        'page_recall': _ratio(pages['tp'], pages['tp'] + pages['fn']),
+        'skipped_pages': pages['tn'] + pages['fn'],
+        'box_recall': _ratio(covered_boxes, labelled_boxes),
+        'region_precision': _ratio(useful_regions, region_count),
+        'full_bytes': full_bytes,
+        'sent_bytes': sent_bytes,
+        'bytes_saved': _ratio(full_bytes - sent_bytes, full_bytes),
+    }
+
+
+def box_to_rect(box, size):
+    ymin, xmin, ymax, xmax = box
+    return xmin * size[0] / 1000, ymin * size[1] / 1000, xmax * size[0] / 1000, ymax * size[1] / 1000
+
+
+def _area(rect):
+    return max(0, rect[2] - rect[0]) * max(0, rect[3] - rect[1])
+
+
+def _intersection(a, b):
+    return _area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def _ratio(a, b):
+    return round(a / b, 3) if b else None
+
+
+def main(argv=None):
+    """Etiket dosyası: {"sayfa1.png": [[ymin, xmin, ymax, xmax], ...], "kapak.png": []} (yollar dosyaya göre)."""
+    from translator import encode_for_api, resize_for_api
+
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Kullanım: python text_regions.py etiketler.json", file=sys.stderr)
+        return 2
+    with open(argv[0], encoding="utf-8") as f:
+        labels = json.load(f)
+    base = os.path.dirname(os.path.abspath(argv[0]))
+    samples = []
+    for name, boxes in labels.items():
+        with Image.open(os.path.join(base, name)) as img:
+            samples.append((resize_for_api(img.convert("RGB")), boxes))
+    report = evaluate(samples, lambda img: encode_for_api(img)['data'])
+    for key, value in report.items():
+        print(f"{key:<18}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Seri bazında kalıcı çeviri belleği ve terim sözlüğü.
+
+Aynı serinin sayfalarında tekrar eden replikler, ses efektleri ve isimler
+her seferinde yeniden (ve çoğu zaman farklı) çevrilmesin diye her blok
+çevirisi normalize edilmiş kaynak metniyle saklanır.
+
+- Birebir eşleşen bloklar bellekten çevrilir ve API'ye gönderilmez.
+- Birebir eşleşmeyen bloklar için 3-gram indeksiyle benzer eski çeviriler
+  bulunur ve tutarlılık için prompta örnek olarak eklenir.
+- Modelin bildirdiği karakter adları ve terimler sözlükte toplanır ve
+  sonraki promptlara eklenir.
+
+Bellek, sözlük ve isabet istatistikleri seri adıyla ayrılır ve oturumlar
+arasında korunur.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+NGRAM = 3
+FUZZY_MIN_SCORE = 0.6
+FUZZY_CANDIDATES = 20
+FUZZY_REFERENCES = 8
+GLOSSARY_LIMIT = 60
+# Tasarruf tahmini için kaba ölçü: yaklaşık 4 karakter bir token
+CHARS_PER_TOKEN = 4
+
+_CHAPTER_MARKER = re.compile(r"\b(?:ch|chap|chapter|b[oö]l[uü]m|vol|volume|cilt|ep|episode|c|v)\.?\s*\d|[\s#]\d", re.IGNORECASE)
+
+
+def normalize(text):
+    """Eşleştirme anahtarı: Unicode NFKC, küçük harf, tek boşluk."""
+    text = unicodedata.normalize("NFKC", str(text)).replace("…", "...")
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def ngrams(normalized):
+    padded = f" {normalized} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+def series_from_filename(filename):
+    """Dosya adından seri adını tahmin eder: 'One Piece - Chapter 1001.cbz' -> 'one piece'.
+
+    Yalnızca adda bölüm/cilt numarası ve ondan önce bir seri adı varsa tahmin
+    yapılır; 'image.png', 'scan.pdf' ya da '001.cbz' gibi adlarda None döner.
+    Aksi hâlde ilgisiz dosyalar aynı belleği paylaşırdı.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    name = re.sub(r"[\[({].*?[\])}]", " ", name)
+    name = re.sub(r"[_.]+", " ", name)
+    marker = _CHAPTER_MARKER.search(name)
+    if marker is None:
+        return None
+    return normalize(name[:marker.start()].strip(" -–—")) or None
+
+
+def estimate_tokens(*texts):
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN
+
+
+class TranslationMemory:
+    """SQLite tabanlı, seri bazında çeviri belleği ve terim sözlüğü."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Komut satırında birden çok süreç aynı dosyayı paylaşabilir
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " series TEXT NOT NULL, source_norm TEXT NOT NULL, source TEXT NOT NULL,"
+            " translation TEXT NOT NULL, gram_count INTEGER NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL,"
+            " PRIMARY KEY (series, source_norm))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_grams ("
+            " series TEXT NOT NULL, gram TEXT NOT NULL, source_norm TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_grams ON memory_grams (series, gram)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS glossary ("
+            " series TEXT NOT NULL, term_norm TEXT NOT NULL, term TEXT NOT NULL,"
+            " translation TEXT NOT NULL, uses INTEGER NOT NULL DEFAULT 1, updated REAL NOT NULL,"
+            " PRIMARY KEY (series, term_norm))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS series_stats ("
+            " series TEXT PRIMARY KEY, lookups INTEGER NOT NULL DEFAULT 0,"
+            " exact_hits INTEGER NOT NULL DEFAULT 0, fuzzy_hits INTEGER NOT NULL DEFAULT 0,"
+            " tokens_saved INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.commit()
+
+    def _bump_stats(self, series, lookups=0, exact_hits=0, fuzzy_hits=0, tokens_saved=0):
+        self.conn.execute("INSERT OR IGNORE INTO series_stats (series) VALUES (?)", (series,))
+        self.conn.execute(
+            "UPDATE series_stats SET lookups = lookups + ?, exact_hits = exact_hits + ?,"
+            " fuzzy_hits = fuzzy_hits + ?, tokens_saved = tokens_saved + ? WHERE series = ?",
+            (lookups, exact_hits, fuzzy_hits, tokens_saved, series),
+        )
+
+    def lookup(self, series, texts, saves_tokens=True):
+        """Her metin için bellekteki çeviriyi ya da None döndürür (aynı sırayla).
+
+        `saves_tokens` False ise (ör. toplu istekte metin zaten modele
+        gönderilmişse) isabetler tasarruf olarak sayılmaz.
+        """
+        results = []
+        hits = saved = 0
+        with self.lock:
+            for text in texts:
+                key = normalize(text)
+                row = self.conn.execute(
+                    "SELECT translation FROM memory WHERE series = ? AND source_norm = ?", (series, key)
+                ).fetchone() if key else None
+                if row is None:
+                    results.append(None)
+                    continue
+                self.conn.execute("UPDATE memory SET hits = hits + 1 WHERE series = ? AND source_norm = ?", (series, key))
+                results.append(row[0])
+                hits += 1
+                if saves_tokens:
+                    saved += estimate_tokens(text, row[0])
+            self._bump_stats(series, lookups=len(texts), exact_hits=hits, tokens_saved=saved)
+            self.conn.commit()
+        return results
+
+    def similar(self, series, texts, limit=FUZZY_REFERENCES):
+        """Metinlere benzeyen eski çevirileri (kaynak, çeviri) olarak döndürür, en benzerler önce."""
+        found = {}
+        matched_texts = 0
+        with self.lock:
+            for text in texts:
+                key = normalize(text)
+                grams = ngrams(key)
+                if len(key) < NGRAM:
+                    continue
+                placeholders = ",".join("?" * len(grams))
+                rows = self.conn.execute(
+                    f"SELECT g.source_norm, COUNT(*) AS shared, m.gram_count, m.source, m.translation"
+                    f" FROM memory_grams g JOIN memory m ON m.series = g.series AND m.source_norm = g.source_norm"
+                    f" WHERE g.series = ? AND g.gram IN ({placeholders}) AND g.source_norm != ?"
+                    f" GROUP BY g.source_norm ORDER BY shared DESC LIMIT ?",
+                    (series, *grams, key, FUZZY_CANDIDATES),
+                ).fetchall()
+                matched = False
+                for source_norm, shared, gram_count, source, translation in rows:
+                    # Dice benzerliği: ortak 3-gram oranı
+                    score = 2 * shared / (len(grams) + gram_count)
+                    if score >= FUZZY_MIN_SCORE:
+                        matched = True
+                        found[source_norm] = max(found.get(source_norm, (0,))[0], score), source, translation
+                matched_texts += matched
+            if matched_texts:
+                self._bump_stats(series, fuzzy_hits=matched_texts)
+                self.conn.commit()
+        best = sorted(found.values(), reverse=True)[:limit]
+        return [(source, translation) for _, source, translation in best]
+
+    def add(self, series, pairs):
+        """(kaynak, çeviri) çiftlerini belleğe ekler; var olan kayıtlar değiştirilmez."""
+        now = time.time()
+        with self.lock:
+            for source, translation in pairs:
+                key = normalize(source)
+                translation = str(translation).strip()
+                if not key or not translation:
+                    continue
+                grams = ngrams(key)
+                inserted = self.conn.execute(
+                    "INSERT OR IGNORE INTO memory (series, source_norm, source, translation, gram_count, updated)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (series, key, source, translation, len(grams), now),
+                ).rowcount
+                if inserted:
+                    self.conn.executemany(
+                        "INSERT INTO memory_grams VALUES (?, ?, ?)", [(series, gram, key) for gram in grams]
+                    )
+            self.conn.commit()
+
+    def add_terms(self, series, terms):
+        """Modelin bildirdiği {'source', 'translation'} terimlerini sözlüğe ekler; ilk çeviri korunur."""
+        now = time.time()
+        with self.lock:
+            for term in terms:
+                if not isinstance(term, dict):
+                    continue
+                source, translation = str(term.get('source', '')).strip(), str(term.get('translation', '')).strip()
+                if not normalize(source) or not translation:
+                    continue
+                self.conn.execute(
+                    "INSERT INTO glossary (series, term_norm, term, translation, updated) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (series, term_norm) DO UPDATE SET uses = uses + 1, updated = excluded.updated",
+                    (series, normalize(source), source, translation, now),
+                )
+            self.conn.commit()
+
+    def glossary(self, series, limit=GLOSSARY_LIMIT):
+        """En sık geçen terimleri (terim, çeviri) olarak döndürür."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT term, translation FROM glossary WHERE series = ? ORDER BY uses DESC, updated DESC LIMIT ?",
+                (series, limit),
+            ).fetchall()
+
+    def prompt_context(self, series, texts=()):
+        """Prompta eklenecek sözlük ve benzer çeviri örnekleri; ikisi de yoksa boş string."""
+        sections = []
+        terms = self.glossary(series)
+        if terms:
+            sections.append("Bu seride kullanılan isim ve terimler (aynı şekilde çevir):\n"
+                            + "\n".join(f"{term} → {translation}" for term, translation in terms))
+        references = self.similar(series, texts) if texts else []
+        if references:
+            sections.append("Benzer replikler daha önce şöyle çevrildi (tutarlı ol):\n"
+                            + "\n".join(f"{source} → {translation}" for source, translation in references))
+        return "\n\n".join(sections)
+
+    def stats(self, series=None):
+        """Seri (ya da tüm bellek) için kayıt sayısı, isabet oranı ve tahmini token tasarrufu."""
+        where, params = ("WHERE series = ?", (series,)) if series else ("", ())
+        with self.lock:
+            entries = self.conn.execute(f"SELECT COUNT(*) FROM memory {where}", params).fetchone()[0]
+            terms = self.conn.execute(f"SELECT COUNT(*) FROM glossary {where}", params).fetchone()[0]
+            lookups, exact_hits, fuzzy_hits, tokens_saved = self.conn.execute(
+                "SELECT COALESCE(SUM(lookups), 0), COALESCE(SUM(exact_hits), 0),"
+                f" COALESCE(SUM(fuzzy_hits), 0), COALESCE(SUM(tokens_saved), 0) FROM series_stats {where}",
+                params,
+            ).fetchone()
+        return {
+            'entries': entries,
+            'terms': terms,
+            'lookups': lookups,
+            'exact_hits': exact_hits,
+            'fuzzy_hits': fuzzy_hits,
+            'hit_rate': round(exact_hits / lookups, 3) if lookups else 0.0,
+            'tokens_saved': tokens_saved,
+        }
@@ -0,0 +1,435 @@
+"""Çeviri çekirdeği: promptlar ve hat aşamaları.
+
+Streamlit'e bağımlı değildir; hem app.py hem de komut satırı (cli.py)
+tarafından kullanılır. Aşama fonksiyonları PagePipeline iş parçacıklarında
+çalışır ve logları kendilerine verilen `log` ile iletir.
+"""
+import io
+import math
+import os
+import time
+from functools import partial
+
+from PIL import Image
+
+from pipeline import Batched, PagePipeline
+from json_stream import JsonArrayStream
+from preview import save_preview
+from renderer import render_translations
+from text_regions import prepare_api_image, to_page_box
+
+# --- Gemini Model Üretici ---
+MODEL_NAME = 'gemini-1.5-pro-latest'
+
+
+def create_model(api_key):
+    """Verilen API anahtarına bağlı bir Gemini modeli oluşturur.
+
+    genai.configure global olduğundan, eşzamanlı iş parçacıklarında farklı
+    anahtarlar kullanabilmek için her modele kendi istemcisi verilir. Gemini
+    paketi burada yüklenir; böylece modül sahte bir modelle (fake_model.py)
+    paket kurulu olmadan da kullanılabilir.
+    """
+    import google.generativeai as genai
+    from google.ai import generativelanguage as glm
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    return model
+
+
+# --- Önbellek Anahtarı ---
+# Prompt metinleri değiştiğinde eski önbellek kayıtlarının kullanılmaması için artırın
+PROMPT_VERSION = "1"
+TARGET_LANGUAGE = "tr"
+
+# --- Gemini API'ye gönderilecek görseli yeniden boyutlandıran fonksiyon ---
+MAX_API_IMAGE_SIZE = 1000
+
+
+API_JPEG_QUALITY = 90
+
+
+def resize_for_api(img):
+    img_api = img.copy()
+    if img_api.width > MAX_API_IMAGE_SIZE or img_api.height > MAX_API_IMAGE_SIZE:
+        img_api.thumbnail((MAX_API_IMAGE_SIZE, MAX_API_IMAGE_SIZE))
+    return img_api
+
+
+def encode_for_api(img):
+    """Görseli bir kez JPEG'e kodlar; gönderilen bayt sayısı böylece ölçülebilir."""
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=API_JPEG_QUALITY)
+    return {'mime_type': 'image/jpeg', 'data': buffer.getvalue()}
+
+
+# --- Promptlar ---
+PROMPT_DETECTION = (
+    "Bu görseldeki konuşma balonları veya mantıksal olarak bağlantılı metin grupları gibi metin bloklarını tespit et. "
+    "Her blok için: "
+    "1. İçindeki tüm metinleri (satır sonlarını koruyarak veya boşlukla birleştirerek) tek bir string olarak 'text' anahtarıyla birleştir. "
+    "2. Tüm metin bloğunu çevreleyen tek bir sınırlayıcı kutuyu [ymin, xmin, ymax, xmax] formatında (0-1000 arası normalize edilmiş) 'box' anahtarıyla ver. "
+    "Sonucu bir JSON listesi olarak döndür. Örneğin: "
+    "[{'text': 'WHAT DOES IT\nMEAN TO BE\nHUMAN...?', 'box': [100, 780, 210, 970]}]"
+)
+PROMPT_BATCH = (
+    "Sana sırayla numaralandırılmış manga sayfaları gönderiyorum. Her sayfadaki konuşma balonları veya mantıksal olarak bağlantılı metin grupları gibi metin bloklarını tespit et ve Türkçeye çevir. "
+    "Her blok için: "
+    "1. İçindeki tüm metinleri tek bir string olarak 'text' anahtarıyla ver. "
+    "2. Bu metnin Türkçe çevirisini 'translation' anahtarıyla ver. "
+    "3. Tüm metin bloğunu çevreleyen tek bir sınırlayıcı kutuyu [ymin, xmin, ymax, xmax] formatında (o sayfaya göre 0-1000 arası normalize edilmiş) 'box' anahtarıyla ver. "
+    "Ayrıca sayfadaki karakter adlarını ve özel terimleri, çeviride kullandığın haliyle 'terms' listesinde ver. "
+    "Sonucu her sayfa için bir nesne içeren JSON listesi olarak döndür, metin olmayan sayfalar için 'blocks' boş liste olsun. Örneğin: "
+    "[{'page': 1, 'blocks': [{'text': 'WHAT DOES IT\nMEAN TO BE\nHUMAN...?', 'translation': 'İNSAN OLMAK\nNE DEMEK...?', 'box': [100, 780, 210, 970]}], 'terms': [{'source': 'NARUTO', 'translation': 'NARUTO'}]}, {'page': 2, 'blocks': [], 'terms': []}]"
+)
+# Yerel ön filtre sayfanın yalnızca metin bölgelerini gönderdiğinde görsele eklenir
+PROMPT_CROPS = (
+    "Bu görsel, sayfadan kırpılmış bölgelerin gri boşluklarla ayrıldığı bir kolajdır. "
+    "Kutuları kolajın tamamına göre ver; bir metin bloğunu iki bölgeye yayma."
+)
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CCComicrazy.ttf")
+
+# --- Toplu İstek Bütçesi ---
+# Gemini görselleri 768px'lik karolara böler, karo başına 258 token sayar.
+# Çıktı payı ile birlikte tek istekte bu bütçeyi aşmayacak kadar sayfa gönderilir.
+IMAGE_TILE_SIZE = 768
+IMAGE_TILE_TOKENS = 258
+OUTPUT_TOKENS_PER_PAGE = 800
+BATCH_TOKEN_BUDGET = 12000
+BATCH_MAX_PAGES = 8
+
+# Çevrilen sayfalar JPEG olarak kaydedilir; dışa aktarırken yeniden kodlanmadan gömülür
+OUTPUT_JPEG_QUALITY = 92
+
+
+def estimate_page_tokens(page):
+    """Sayfanın toplu istekte kaplayacağı tahmini token sayısı; önbellekteki sayfa yer kaplamaz."""
+    if not needs_api(page):
+        return 0
+    width, height = page['api_size']
+    tiles = math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+    return tiles * IMAGE_TILE_TOKENS + OUTPUT_TOKENS_PER_PAGE
+
+
+def needs_api(page):
+    """Önbellekte bulunan ya da ön filtrede metinsiz çıkan sayfa için API çağrısı yapılmaz."""
+    return not page.get('cached') and not page.get('text_free')
+
+
+def to_page_boxes(page, items):
+    """Kolaja göre verilen kutuları sayfaya göre çevirir; hiçbir bölgeye düşmeyen öğeler atılır."""
+    placements = page.get('placements')
+    if not placements:
+        return items
+    mapped = []
+    for item in items:
+        box = to_page_box(item['box'], page['api_size'], placements, page['img_api'].size)
+        if box is not None:
+            mapped.append(dict(item, box=box))
+    return mapped
+
+
+def _valid_coordinate(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _valid_block(block):
+    """Kutusu dört sonlu sayıdan oluşan, metni string olan blok; tek bir bozuk değer çizimi düşürmesin."""
+    if not isinstance(block, dict) or not isinstance(block.get('text', ''), str):
+        return False
+    box = block.get('box')
+    return isinstance(box, list) and len(box) == 4 and all(_valid_coordinate(value) for value in box)
+
+
+def _valid_blocks(blocks):
+    return isinstance(blocks, list) and all(_valid_block(block) for block in blocks)
+
+
+# --- Hat Aşamaları ---
+class Translator:
+    """Anahtar havuzu ve önbellekle sayfaları tespit eden, çeviren ve çizen aşamalar.
+
+    `make_previews` açıksa çizim aşaması okuyucu için hafif bir önizleme de
+    üretir; komut satırı gibi arayüzsüz kullanımlarda kapatılabilir. Her
+    adımın süresi anahtar havuzuyla paylaşılan `metrics`'e yazılır.
+    `memory` verilirse seri adı bilinen sayfalarda çeviri belleği kullanılır.
+    """
+
+    def __init__(self, key_pool, cache, font_path=FONT_PATH, make_previews=True, memory=None):
+        self.key_pool = key_pool
+        self.cache = cache
+        self.memory = memory
+        self.font_path = font_path
+        self.make_previews = make_previews
+        self.metrics = key_pool.metrics
+
+    def load_page(self, page, log, prefilter=True, series=None):
+        """Sayfa baytlarını çözer, API için küçültülmüş kopyasını hazırlar ve önbelleğe bakar.
+
+        Aynı (ya da çok benzer) sayfa daha önce çevrildiyse sonuç önbellekten
+        alınır ve hiç API çağrısı yapılmaz. `prefilter` açıksa metin adayı
+        olmayan sayfalar atlanır, diğerlerinden yalnızca metin bölgeleri gönderilir.
+        `series`, sonraki aşamalarda kullanılacak çeviri belleğini seçer.
+        """
+        idx = page.get('idx')
+        page['series'] = series
+        with self.metrics.span('decode', idx):
+            img = Image.open(io.BytesIO(page.pop('data'))).convert("RGB")
+        page['img'] = img
+        with self.metrics.span('resize', idx):
+            page['img_api'] = resize_for_api(img)
+        with self.metrics.span('cache_lookup', idx):
+            page['cache_keys'] = self.cache.keys_for(page['img_api'])
+            cached = self.cache.get(page['cache_keys'], PROMPT_VERSION, TARGET_LANGUAGE)
+        if cached is not None:
+            self.metrics.count('cache_hits')
+            page['detected_items'] = cached['detected_items']
+            page['translated_blocks'] = cached['translated_blocks']
+            page['cached'] = True
+            return page
+        self.metrics.count('cache_misses')
+        api_img, placements = page['img_api'], None
+        if prefilter:
+            with self.metrics.span('prefilter', idx):
+                api_img, placements = prepare_api_image(page['img_api'])
+            if api_img is None:
+                self.metrics.count('prefilter_skipped')
+                log("Ön filtre: sayfada metin bulunamadı, API'ye gönderilmedi.")
+                page['detected_items'] = []
+                page['translated_blocks'] = []
+                page['text_free'] = True
+                return page
+            if placements:
+                self.metrics.count('prefilter_cropped')
+        page['placements'] = placements
+        page['api_size'] = api_img.size
+        with self.metrics.span('encode', idx):
+            page['img_blob'] = encode_for_api(api_img)
+        return page
+
+    def stream_items(self, content, parser, log, idx=None):
+        """İsteği akışla gönderir; yanıttaki JSON listesinin öğelerini tamamlandıkça verir.
+
+        (öğe, tam) çiftleri üretir. Yanıt yarıda kesildiyse son öğenin
+        kurtarılan kısmı `tam=False` ile gelir. Bozuk öğeler atlanır ve
+        `parser` üzerinde sayılır.
+        """
+        for chunk in self.key_pool.stream(content, log=log):
+            with self.metrics.span('json_parse', idx):
+                items = parser.feed(chunk)
+            for item in items:
+                yield item, True
+        for item in parser.close():
+            yield item, False
+        if parser.skipped:
+            self.metrics.count('json_items_skipped', parser.skipped)
+            log(f"UYARI: Yanıttaki {parser.skipped} bozuk öğe atlandı.")
+        if parser.recovered:
+            self.metrics.count('json_items_recovered', parser.recovered)
+            log("UYARI: Yanıt yarıda kesilmiş, son öğenin geçerli kısmı kurtarıldı.")
+
+    def detect_page(self, page, log):
+        """Gemini ile sayfadaki metin bloklarını ve kutularını tespit eder.
+
+        Yanıt akışla alınır; bozuk ya da yarım kalan bloklar atılır, geçerli
+        bloklar korunur. Yanıt eksikse (liste kapanmadı, öğe atlandı ya da
+        kurtarıldı) sayfa `partial` işaretlenir ve önbelleğe yazılmaz; hiç
+        geçerli blok kalmadıysa hata sayılır.
+        """
+        if not needs_api(page):
+            return page
+        content = [PROMPT_DETECTION, page['img_blob']]
+        if page.get('placements'):
+            content.insert(1, PROMPT_CROPS)
+        parser = JsonArrayStream()
+        with self.metrics.span('detect_call', page.get('idx')):
+            items = [item for item, _ in self.stream_items(content, parser, log, page.get('idx'))]
+        if not parser.started:
+            page['status'] = 'error'
+            page['log'] = 'Gemini API yanıtı boş ya da JSON listesi içermiyor.'
+            log('UYARI: Gemini API yanıtında JSON listesi bulunamadı.')
+            return page
+        blocks = [item for item in items if _valid_block(item)]
+        if len(blocks) < len(items):
+            log(f"UYARI: Kutusu eksik ya da bozuk {len(items) - len(blocks)} blok atlandı.")
+        if not parser.complete or len(blocks) < len(items):
+            if not blocks:
+                page['status'] = 'error'
+                page['log'] = 'Gemini API yanıtı eksik ya da bozuk geldi.'
+                log('UYARI: Gemini API yanıtı eksik ya da bozuk, sayfada geçerli blok yok.')
+                return page
+            page['partial'] = True
+            log(f"UYARI: Yanıt eksik; sayfa {len(blocks)} blokla çizilecek ama önbelleğe yazılmayacak.")
+        page['detected_items'] = to_page_boxes(page, blocks)
+        return page
+
+    def _memory_for(self, page):
+        """Sayfanın serisi biliniyorsa (bellek, seri) döndürür."""
+        if self.memory is not None and page.get('series'):
+            return self.memory, page['series']
+        return None, None
+
+    def translate_page(self, page, log):
+        """Tespit edilen blokları tek istekte Türkçeye çevirir.
+
+        Çeviri belleğinde birebir bulunan bloklar gönderilmez; hepsi
+        bulunursa hiç API çağrısı yapılmaz. Diğerleri için promta serinin
+        sözlüğü ve benzer eski çeviriler eklenir.
+        """
+        if not needs_api(page):
+            return page
+        all_texts = [item.get('text', '') for item in page['detected_items']]
+        memory, series = self._memory_for(page)
+        translations = memory.lookup(series, all_texts) if memory else [None] * len(all_texts)
+        missing = [i for i, translation in enumerate(translations) if translation is None]
+        self.metrics.count('tm_exact_hits', len(all_texts) - len(missing))
+        self.metrics.count('tm_misses', len(missing))
+        if missing:
+            texts = [all_texts[i] for i in missing]
+            joined_text = '\n---\n'.join(texts)
+            prompt_translation = f"Aşağıdaki metin bloklarını Türkçeye çevir. Her blok arasını --- ile ayırdım, sen de çeviride blokları aynı sırayla --- ile ayırarak döndür:\n\n{joined_text}"
+            context = memory.prompt_context(series, texts) if memory else ""
+            if context:
+                prompt_translation = f"{context}\n\n{prompt_translation}"
+            with self.metrics.span('translate_call', page.get('idx')):
+                response_translation = self.key_pool.call(prompt_translation, log=log)
+            if response_translation is None:
+                page['status'] = 'error'
+                page['log'] = 'Çeviri başarısız.'
+                return page
+            translated_text = response_translation.text.strip()
+            parts = [b.strip() for b in translated_text.split('---')]
+            # Blok sayısı tutmuyorsa eşleşme şüphelidir; belleğe ve önbelleğe yazılmaz
+            if len(parts) != len(texts):
+                page['partial'] = True
+            elif memory:
+                memory.add(series, zip(texts, parts))
+            for i, part in zip(missing, parts):
+                translations[i] = part
+        elif all_texts:
+            log(f"Çeviri belleği: {len(all_texts)} bloğun tamamı bellekten çevrildi, API çağrısı yapılmadı.")
+        page['translated_blocks'] = translations
+        if page.get('partial'):
+            return page
+        self.cache.put(page['cache_keys'], PROMPT_VERSION, TARGET_LANGUAGE, page['detected_items'], page['translated_blocks'])
+        return page
+
+    def detect_and_translate_page(self, page, log):
+        """Tek sayfayı ayrı tespit ve çeviri istekleriyle işler."""
+        page = self.detect_page(page, log)
+        if page.get('status') == 'error':
+            return page
+        return self.translate_page(page, log)
+
+    def detect_and_translate_batch(self, pages, log):
+        """Birden çok sayfayı tek istekte tespit edip çevirir.
+
+        Yanıt akışla alınır ve her sayfa, yanıttaki girdisi tamamlanır
+        tamamlanmaz verilir (jeneratör); böylece çizim grubun geri kalanını
+        beklemez. Yanıtta eksik, bozuk ya da yarım kalmış sayfalar tek
+        sayfalık isteklere düşer.
+        """
+        todo = [page for page in pages if needs_api(page)]
+        for page in pages:
+            if not needs_api(page):
+                yield page
+        if len(todo) == 1:
+            yield self.detect_and_translate_page(todo[0], log)
+        if len(todo) <= 1:
+            return
+        memory, series = self._memory_for(todo[0])
+        content = [PROMPT_BATCH, f"Toplam sayfa sayısı: {len(todo)}"]
+        context = memory.prompt_context(series) if memory else ""
+        if context:
+            content.insert(1, context)
+        for number, page in enumerate(todo, 1):
+            content += [f"Sayfa {number}:", page['img_blob']]
+            if page.get('placements'):
+                content.append(f"Sayfa {number} için not: {PROMPT_CROPS}")
+        remaining = dict(enumerate(todo, 1))
+        # Verilen sayfa sonraki aşamalarda işlenirken geçen süre çağrıya sayılmaz
+        call_time, started = 0.0, time.perf_counter()
+        for entry, complete in self.stream_items(content, JsonArrayStream(), log):
+            try:
+                number = int(entry['page'])
+            except (TypeError, ValueError, KeyError):
+                continue
+            page = remaining.get(number)
+            # Yarım kalan sayfa eksik bloklarla önbelleğe yazılmasın diye tek istekle yeniden çevrilir
+            if page is None or not complete or not _valid_blocks(entry.get('blocks')):
+                continue
+            del remaining[number]
+            blocks = to_page_boxes(page, entry['blocks'])
+            page['detected_items'] = [{'text': block.get('text', ''), 'box': block['box']} for block in blocks]
+            page['translated_blocks'] = [str(block.get('translation', '')).strip() for block in blocks]
+            if memory:
+                self._apply_memory(memory, series, page, entry.get('terms'))
+            self.cache.put(page['cache_keys'], PROMPT_VERSION, TARGET_LANGUAGE, page['detected_items'], page['translated_blocks'])
+            call_time += time.perf_counter() - started
+            yield page
+            started = time.perf_counter()
+        self.metrics.record('batch_call', None, call_time + time.perf_counter() - started)
+        log(f"Toplu istek: {len(todo) - len(remaining)}/{len(todo)} sayfa tek çağrıda işlendi.")
+        for number, page in remaining.items():
+            log(f"UYARI: Toplu yanıtta {number}. sayfa eksik ya da bozuk, tek istekle tekrar deneniyor.")
+            yield self.detect_and_translate_page(page, log)
+
+    def _apply_memory(self, memory, series, page, terms):
+        """Toplu yanıttaki çevirileri bellekle tutarlı hale getirir, yenilerini ve terimleri belleğe ekler."""
+        texts = [item['text'] for item in page['detected_items']]
+        # Metinler modele zaten gönderildiği için isabetler tasarruf sayılmaz
+        remembered = memory.lookup(series, texts, saves_tokens=False)
+        hits = sum(translation is not None for translation in remembered)
+        self.metrics.count('tm_exact_hits', hits)
+        self.metrics.count('tm_misses', len(texts) - hits)
+        memory.add(series, [(text, translation) for text, translation, known in zip(texts, page['translated_blocks'], remembered) if known is None])
+        page['translated_blocks'] = [known if known is not None else translation for translation, known in zip(page['translated_blocks'], remembered)]
+        if isinstance(terms, list):
+            memory.add_terms(series, terms)
+
+    def render_page(self, page, log):
+        """Çevirileri sayfanın üzerine çizer ve sonucu `page['out_path']`'e kaydeder."""
+        idx = page.get('idx')
+        with self.metrics.span('layout_composite', idx):
+            processed_img = render_translations(page['img'], page['detected_items'], page['translated_blocks'], self.font_path)
+        with self.metrics.span('save', idx):
+            processed_img.save(page['out_path'], format="JPEG", quality=OUTPUT_JPEG_QUALITY)
+        page['translated_img_path'] = page['out_path']
+        if self.make_previews:
+            with self.metrics.span('preview', idx):
+                page['preview_path'] = save_preview(processed_img, page['out_path'])
+        page['status'] = 'done'
+        page['log'] = 'Çeviri tamamlandı.'
+        return page
+
+    def build_pipeline(self, batch_mode, render_workers=None, prefilter=True, series=None):
+        """API aşamaları anahtar sayısı kadar, çizim aşaması çekirdek sayısı kadar işçiyle çalışır.
+
+        Toplu modda tespit ve çeviri, birden çok sayfa için tek istekte yapılır.
+        `prefilter` yükleme aşamasındaki yerel metin ön filtresini açar;
+        `series` verilirse o serinin çeviri belleği kullanılır.
+        """
+        api_workers = max(1, len(self.key_pool))
+        if render_workers is None:
+            render_workers = max(1, min(4, os.cpu_count() or 1))
+        if batch_mode:
+            api_stages = [
+                ('Tespit ve Çeviri', Batched(self.detect_and_translate_batch, estimate_page_tokens, BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_PAGES), api_workers),
+            ]
+            queue_size = max(api_workers * 2, BATCH_MAX_PAGES)
+        else:
+            api_stages = [
+                ('Tespit', self.detect_page, api_workers),
+                ('Çeviri', self.translate_page, api_workers),
+            ]
+            queue_size = api_workers * 2
+        return PagePipeline([('Yükleme', partial(self.load_page, prefilter=prefilter, series=series), 1)] + api_stages + [('Çizim', self.render_page, render_workers)], queue_size=queue_size, metrics=self.metrics)
+
+    def process_page(self, page, log=print, prefilter=True, series=None):
+        """Tek sayfayı tüm aşamalardan bu iş parçacığında sırayla geçirir (profil çıkarmak için)."""
+        page = self.detect_and_translate_page(self.load_page(page, log, prefilter, series), log)
+        if page.get('status') == 'error':
+            return page
+        return self.render_page(page, log)
+